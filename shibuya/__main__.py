@@ -0,0 +1,15 @@
+"""python -m shibuya [-j processes] [-t timeout] [outdir [module ...]]:
+build the gallery of all constructors (see shibuya.gallery)."""
+import argparse
+from shibuya.catalogue import module_names
+from shibuya.gallery import build_gallery
+
+parser = argparse.ArgumentParser(prog="python -m shibuya", description="Draw every constructor into a gallery.")
+parser.add_argument("outdir", nargs="?", default="gallery")
+parser.add_argument("modules", nargs="*", help="modules to draw, like graphs.unitdist (default: all)")
+parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+parser.add_argument("-t", "--timeout", type=float, default=60, help="seconds allowed per item")
+args = parser.parse_args()
+modules = [f"shibuya.{m}" for m in args.modules] or module_names()
+rows = build_gallery(args.outdir, modules, args.processes, args.timeout)
+print(f"{len(rows)} items, {sum('error' in row for row in rows)} failed")
@@ -0,0 +1,105 @@
+"""
+Animated sweeps through one-parameter families of embeddings, like those given
+by the parametrised *_vertices() helpers or constructors such as cubesym.f40a(x).
+sweep() evaluates a family over a grid of parameter values, warm-starting each
+solve from the previous frame and splitting the grid between worker processes;
+write_smil() and write_frames() then draw the result.
+"""
+import os
+import xml.etree.ElementTree as ET
+from mpmath import *
+from shibuya.draw import drawing
+from shibuya.generators import all_unit_distances, constraint_list, pool_map
+
+def _solve(vertfunc, t, x):
+    """Solve the constraints of vertfunc(t, *x) for x, starting from x."""
+    if not x:
+        return ()
+    if len(x) == 1: # findroot()'s one-dimensional solvers want a scalar function
+        return (findroot(lambda y: constraint_list(vertfunc(t, y))[0], x[0]),)
+    return tuple(findroot(lambda *y: constraint_list(vertfunc(t, *y)), x))
+
+def _sweep_chunk(vertfunc, ts, x, prec):
+    with workprec(prec):
+        frames = []
+        for t in ts:
+            x = _solve(vertfunc, t, x)
+            frames.append((x, [complex(v) for v in vertfunc(t, *x)[0]]))
+        return frames
+
+def sweep(vertfunc, ts, x0=(), processes=None, chunks=None):
+    """Evaluate a one-parameter family of embeddings at each parameter value in ts,
+    returning a list of (x, vertices) with the vertices as Python complex numbers.
+
+    vertfunc(t, *x) returns a tuple (vertices, constraints...) like the *_vertices()
+    helpers; for each t the constraints are solved for x by findroot(), starting
+    from the previous frame's x (x0 for the first). With x0 empty nothing is solved
+    and vertfunc(t) can be any function whose result starts with the vertices –
+    a graph constructor, say.
+
+    The grid is cut into chunks (by default one per worker) that are evaluated in
+    a pool of processes (processes=1 evaluates serially in this process); the
+    first frame of each chunk is found by continuation along the chunk starts.
+    vertfunc must be picklable, i.e. a module-level function."""
+    ts = list(ts)
+    x = tuple(x0)
+    if processes == 1 or len(ts) < 2:
+        return _sweep_chunk(vertfunc, ts, x, mp.prec)
+    n = min(chunks or processes or os.cpu_count() or 1, len(ts))
+    bounds = [len(ts)*i//n for i in range(n+1)]
+    seeds = []
+    for b in bounds[:-1]:
+        x = _solve(vertfunc, ts[b], x)
+        seeds.append(x)
+    parts = pool_map(_sweep_chunk, [(vertfunc, ts[a:b], x, mp.prec)
+                                    for (a, b, x) in zip(bounds, bounds[1:], seeds)], processes)
+    return [frame for part in parts for frame in part]
+
+def frame_edges(vertfunc, t, x=(), tol=1e-9):
+    """Return the unit-distance edges of the embedding vertfunc(t, *x),
+    to be kept fixed through an animation."""
+    return all_unit_distances([complex(v) for v in vertfunc(t, *x)[0]], tol)[1]
+
+def _viewport(frames, pad):
+    """Return the (canvas, offset) of a drawing containing every frame's vertices."""
+    reals = [v.real for (_, vertices) in frames for v in vertices]
+    imags = [v.imag for (_, vertices) in frames for v in vertices]
+    x, y = min(reals) - pad, min(imags) - pad
+    return ((max(reals) - x + pad, max(imags) - y + pad), (x, y))
+
+def write_smil(frames, edges, outfn, dur=4, scale=400, pad=0.04, vertsize=0.02, edgewidth=0.005):
+    """Write the frames returned by sweep() as a single SVG, outfn.svg, whose edge
+    and vertex paths are animated with SMIL over dur seconds, back and forth.
+    The path commands are the same in every frame; only the numbers change."""
+    canvas, offset = _viewport(frames, pad)
+    res = drawing(scale, canvas, offset)
+    points = [[(v.real, v.imag) for v in vertices] for (_, vertices) in frames]
+    ds = [res.edges_path(p, edges) for p in points]
+    ds += ds[-2:0:-1]
+    el = res.add_edges(points[0], edges, {"fill": "none", "stroke": "#000", "stroke-width": edgewidth,
+                                          "stroke-linejoin": "round"})
+    ET.SubElement(el, "animate", {"attributeName": "d", "values": ";".join(ds),
+                                  "dur": f"{dur}s", "repeatCount": "indefinite"})
+    ds = [res.dots_path(p) for p in points]
+    ds += ds[-2:0:-1]
+    el = res.add_dots(points[0], vertsize)
+    ET.SubElement(el, "animate", {"attributeName": "d", "values": ";".join(ds),
+                                  "dur": f"{dur}s", "repeatCount": "indefinite"})
+    res.write(outfn)
+
+def _write_frame(surface, scale, canvas, offset, points, edges, vertsize, edgewidth, outfn):
+    res = surface(scale, canvas, offset)
+    res.add_edges(points, edges, {"fill": "none", "stroke": "#000", "stroke-width": edgewidth,
+                                  "stroke-linejoin": "round"})
+    res.add_dots(points, vertsize)
+    res.write(outfn)
+
+def write_frames(frames, edges, outfn, scale=400, pad=0.04, vertsize=0.02, edgewidth=0.005,
+                 surface=drawing, processes=None):
+    """Write the frames returned by sweep() as a numbered sequence of drawings
+    outfn-0000.svg, outfn-0001.svg, ... (PNG if surface is raster) with a
+    common viewport, in a pool of processes."""
+    canvas, offset = _viewport(frames, pad)
+    args = [(surface, scale, canvas, offset, [(v.real, v.imag) for v in vertices],
+             edges, vertsize, edgewidth, f"{outfn}-{i:04d}") for (i, (_, vertices)) in enumerate(frames)]
+    pool_map(_write_frame, args, processes)
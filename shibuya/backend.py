@@ -0,0 +1,160 @@
+"""
+A float64 fast path for the constructors. Every module here does its arithmetic
+through names imported by "from mpmath import *"; within float_backend() those
+names are rebound to their counterparts in mpmath's fp context, which works on
+Python floats and complex numbers, so the same construction code runs several
+times faster – good enough for pictures, if not for proofs.
+Run as python -m shibuya.backend to check generators' cached functions and compare
+both backends over the catalogue; it exits with an error if a cached call differs
+from an uncached one or any graph that mpmath can build differs under floats.
+"""
+import io
+import math
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+import mpmath
+from mpmath import fp
+from shibuya.catalogue import module_names, constructors
+
+def _fp_findroot(*args, tol=1e-24, **kwargs):
+    """fp.findroot() with a tolerance tight enough to match mpmath to 1e-12."""
+    return fp.findroot(*args, tol=tol, **kwargs)
+
+def _fp_polyroots(*args, **kwargs):
+    """Polynomial roots are found by mpmath (fp.polyroots() needs extra precision
+    the float context cannot give) and converted to floats."""
+    return [complex(r) if isinstance(r, mpmath.mpc) else float(r) for r in mpmath.polyroots(*args, **kwargs)]
+
+# names with no usable fp counterpart, or that must keep meaning mpmath's context
+fp_extras = {"fraction": lambda p, q: p / q, "degree": math.pi / 180, "hypot": math.hypot,
+             "mpmathify": fp.convert, "findroot": _fp_findroot, "polyroots": _fp_polyroots}
+fp_keep = {"mp", "fp", "workprec", "workdps", "extraprec", "extradps", "autoprec"}
+
+def _module_rebindings(mod):
+    """Return {name: fp value} for every mpmath name imported into the module
+    that has a float counterpart."""
+    res = {}
+    for (name, obj) in list(vars(mod).items()):
+        orig = getattr(mpmath, name, None)
+        # names bound to mpmath functions, or to generators' caches of them
+        if name.startswith("_") or name in fp_keep or orig is None or \
+                not (orig is obj or orig is getattr(obj, "__wrapped__", None)):
+            continue
+        new = fp_extras[name] if name in fp_extras else getattr(fp, name, None)
+        if new is not None:
+            res[name] = new
+    return res
+
+_targets = {}
+
+def _rebindings():
+    """Return a list of (module globals, {name: fp value}) over the loaded
+    Shibuya modules. Each module is scanned only the first time it is seen,
+    so entering float_backend() costs little more than the rebinding itself."""
+    res = []
+    for (modname, mod) in list(sys.modules.items()):
+        if not (modname == "shibuya" or modname.startswith("shibuya.")) or mod is None:
+            continue
+        if _targets.get(modname, (None,))[0] is not mod:
+            _targets[modname] = (mod, _module_rebindings(mod))
+        if _targets[modname][1]:
+            res.append((vars(mod), _targets[modname][1]))
+    return res
+
+@contextmanager
+def float_backend():
+    """Within this context, constructors in already imported Shibuya modules
+    compute with floats (mpmath's fp context) instead of mpmath numbers.
+    The switch rebinds module globals, so it affects all threads."""
+    saved = []
+    try:
+        for (globs, new) in _rebindings():
+            saved.append((globs, {name: globs[name] for name in new}))
+            globs.update(new)
+        yield
+    finally:
+        for (globs, old) in reversed(saved):
+            globs.update(old)
+
+def construct(f, *args, backend="mp", prec=None, **kwargs):
+    """Call the constructor f with the given arguments under the given backend,
+    "mp" (mpmath, the default) or "fp" (floats), in the former case at prec bits
+    if given (see also precision.thread_local_precision())."""
+    if backend == "fp":
+        with float_backend():
+            return f(*args, **kwargs)
+    if prec is not None:
+        with mpmath.workprec(prec):
+            return f(*args, **kwargs)
+    return f(*args, **kwargs)
+
+def deviation(G1, G2):
+    """Return the largest distance between corresponding vertices of two embeddings
+    of the same graph, or inf if they have different vertex or edge sets."""
+    (V1, E1), (V2, E2) = G1, G2
+    if len(V1) != len(V2) or sorted(map(tuple, E1)) != sorted(map(tuple, E2)):
+        return math.inf
+    return max((abs(complex(a) - complex(b)) for (a, b) in zip(V1, V2)), default=0.0)
+
+def compare_backends(modules=None, tol=1e-12):
+    """Construct every catalogue graph (modules as for gallery.build_gallery(),
+    by default all graph modules) under both backends and return a list of
+    (module, name, deviation, mp seconds, fp seconds, error) rows; a graph
+    passes when its deviation is at most tol and error is None."""
+    if modules is None:
+        modules = [m for m in module_names() if m.startswith("shibuya.graphs.")]
+    rows = []
+    for modname in modules:
+        for (name, f) in constructors(modname):
+            err = None
+            dev = tm = tf = math.nan
+            try:
+                with redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    Gm = construct(f)
+                    tm = time.perf_counter() - start
+                    start = time.perf_counter()
+                    Gf = construct(f, backend="fp")
+                    tf = time.perf_counter() - start
+                dev = deviation(Gm, Gf)
+            except Exception as e:
+                err = f"{type(e).__name__}: {e}"
+            if err is None and not dev <= tol:
+                err = "edge sets differ" if dev == math.inf else f"deviation {dev:.3g} > {tol:g}"
+            rows.append((modname, name, dev, tm, tf, err))
+    return rows
+
+def check_caches():
+    """Call generators' cached functions, positionally and with keyword arguments,
+    at two precisions and under float_backend(), and return the calls whose results
+    differ from the uncached function's."""
+    from shibuya import generators
+    calls = [("star_radius", (5,), {}), ("star_radius", (5,), {"q": 2}), ("star_radius", (), {"p": 7, "q": 3}),
+             ("unitroots", (6,), {}), ("unitroots", (6,), {"primitive": True}),
+             ("root", (2, 3), {}), ("root", (2, 3), {"k": 1})]
+    bad = []
+    for (label, ctx) in (("mp", mpmath.workprec(53)), ("mp 113 bits", mpmath.workprec(113)), ("fp", float_backend())):
+        with ctx:
+            for (name, args, kwargs) in calls * 2: # the second round hits the cache
+                f = getattr(generators, name)
+                if f(*args, **kwargs) != getattr(f, "__wrapped__", f)(*args, **kwargs):
+                    bad.append(f"{name}{args} {kwargs} ({label})")
+    return bad
+
+if __name__ == "__main__":
+    bad = check_caches()
+    for call in bad:
+        print(f"cached {call} differs")
+    if bad:
+        sys.exit(f"{len(bad)} cached calls differ")
+    rows = compare_backends()
+    for (modname, name, dev, tm, tf, err) in rows:
+        print(f"{modname.rsplit('.', 1)[-1]}.{name}: {dev:.2e} {tm:.3f}s / {tf:.3f}s" + (f"  FAIL {err}" if err else ""))
+    failed = sum(row[-1] is not None for row in rows)
+    # graphs that cannot be built with mpmath either are not the backend's fault
+    broken = [row for row in rows if row[-1] is not None and not math.isnan(row[3])]
+    print(f"{len(rows) - failed}/{len(rows)} passed, total speedup "
+          f"{sum(r[3] for r in rows if r[-1] is None) / sum(r[4] for r in rows if r[-1] is None):.1f}x")
+    if broken:
+        sys.exit(f"{len(broken)} graphs differ under the float backend")
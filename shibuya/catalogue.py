@@ -0,0 +1,65 @@
+"""
+Discovery of the graph, packing and covering constructors in Shibuya,
+for tools that have to run all of them (reports, galleries and the like).
+"""
+import hashlib
+import inspect
+from importlib import import_module
+
+graph_modules = ("bracepoly", "circular", "cubesym", "cubesym2", "igraph",
+                 "pegg", "polyhedra", "snarks", "unitdist")
+packing_modules = ("hexhex", "ptci", "ptsq", "sqsq")
+covering_modules = ("cici", "cisq")
+
+def module_names(graphs=graph_modules, packing=packing_modules, covering=covering_modules):
+    """Return the full names of the given constructor modules."""
+    return ([f"shibuya.graphs.{m}" for m in graphs] + [f"shibuya.packing.{m}" for m in packing] +
+            [f"shibuya.covering.{m}" for m in covering])
+
+def _takes_no_arguments(f):
+    """Whether f can be called without arguments. Wrappers taking (*args, **kwargs),
+    like those made by remove_edges(), are looked through."""
+    P = inspect.Parameter
+    while True:
+        params = inspect.signature(f, follow_wrapped=False).parameters.values()
+        kinds = {p.kind for p in params}
+        if kinds == {P.VAR_POSITIONAL, P.VAR_KEYWORD} and hasattr(f, "__wrapped__"):
+            f = f.__wrapped__
+            continue
+        return all(p.default is not P.empty or p.kind in (P.VAR_POSITIONAL, P.VAR_KEYWORD)
+                   for p in params)
+
+def constructors(modname):
+    """Return a list of (name, function) for the constructors in the named module:
+    public functions defined there that can be called with no arguments,
+    excluding the parametrised *_vertices() helpers and drawing functions."""
+    mod = import_module(modname)
+    res = []
+    for (name, f) in vars(mod).items():
+        if (name.startswith("_") or name.endswith("_vertices") or name.startswith("draw")
+                or not inspect.isfunction(f) or f.__module__ != modname):
+            continue
+        if _takes_no_arguments(f):
+            res.append((name, f))
+    return res
+
+def source_hash(modname):
+    """Return a SHA-256 hex digest of the named module's source together with
+    that of every Shibuya module it depends on, recursively. Results computed
+    from a module's constructors only need recomputing when this changes."""
+    seen = set()
+    stack = [modname]
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for obj in vars(import_module(name)).values():
+            dep = obj.__name__ if inspect.ismodule(obj) else getattr(obj, "__module__", None)
+            if isinstance(dep, str) and dep.startswith("shibuya") and dep not in seen:
+                stack.append(dep)
+    h = hashlib.sha256()
+    for name in sorted(seen):
+        h.update(name.encode())
+        h.update(inspect.getsource(import_module(name)).encode())
+    return h.hexdigest()
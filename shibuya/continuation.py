@@ -0,0 +1,113 @@
+"""
+Predictor-corrector continuation of parametrised embeddings. track() follows the
+solutions x of the constraints of vertfunc(t, *x) as t varies, by pseudo-arclength
+continuation: each step predicts along the curve's tangent (the null vector of the
+constraints' Jacobian), corrects orthogonally to it and adapts the step length to how
+easily the corrector converged. The corrector starts from the Jacobian at the last
+point and improves it by Broyden updates, so a step costs one Jacobian and only a few
+more evaluations of vertfunc, where an independent solve needs several. Since the curve is
+parametrised by arclength rather than t it can be followed around turning points,
+which are reported along with bifurcations and the points where it cannot be continued.
+"""
+from mpmath import *
+from shibuya.generators import constraint_list, refine_root
+from shibuya.graphs.rigidity import jacobian
+
+def _augmented(J, tau):
+    """The square matrix of J with the row tau added below."""
+    n = J.rows
+    A = matrix(n+1, n+1)
+    for i in range(n):
+        for j in range(n+1):
+            A[i,j] = J[i,j]
+    for j in range(n+1):
+        A[n,j] = tau[j]
+    return A
+
+def _tangent(J, prev):
+    """Return the unit tangent at a point where the constraints have Jacobian J,
+    oriented like prev, and the determinant of J augmented by it."""
+    tau = lu_solve(_augmented(J, prev), matrix([0]*J.rows + [1]))
+    tau /= norm(tau)
+    return (tau, det(_augmented(J, tau)))
+
+def _correct(G, yp, tau, J, maxcorr, tol):
+    """Solve G(z) = 0, tau . (z - yp) = 0 from yp by Broyden's method starting
+    from the Jacobian J. Return (z, G(*z), evaluations) or None if the
+    residual does not fall below tol quickly."""
+    z = yp
+    try:
+        r = G(*z)
+        for it in range(1, maxcorr+1):
+            if norm(r) <= tol:
+                return (z, r, it)
+            dz = lu_solve(_augmented(J, tau), -matrix(list(r) + [fdot(tau, z - yp)]))
+            z = z + dz
+            rnew = G(*z)
+            if norm(rnew) > norm(r):
+                return None
+            J = J + (rnew - r - J*dz) * dz.T / fdot(dz, dz)
+            r = rnew
+    except (ValueError, ZeroDivisionError):
+        pass
+    return None
+
+def track(vertfunc, t0, t1, x0, h=0.01, hmin=1e-10, hmax=0.1, maxsteps=10000, maxcorr=6):
+    """Follow the embeddings given by vertfunc(t, *x), whose result is
+    (vertices, constraint, ...) like the *_vertices() helpers, from t0 towards t1.
+    x0 approximates the solution x at t0; there must be as many constraints as
+    entries of x. h is the initial step length along the curve, adapted between
+    hmin and hmax. Intermediate points satisfy the constraints to about 7/8 of
+    the working precision, the end points to all of it.
+
+    Return (points, events). points lists the (t, x) found, ending at t1 – or where
+    the curve leaves the interval between t0 and t1, or at a singularity. events
+    lists (kind, t, x) where kind is "turning point" (t reverses along the curve),
+    "bifurcation" (the determinant of the augmented Jacobian changes sign) or
+    "singular" (the step length fell below hmin), located to within one step."""
+    G = lambda *y: matrix(constraint_list(vertfunc(*y)))
+    x = refine_root(lambda *x: G(t0, *x), x0)[0]
+    tol = ldexp(1, -(7*mp.prec)//8)
+    y = matrix([t0] + x)
+    J = jacobian(G, y)
+    tau, D = _tangent(J, matrix([sign(t1 - t0)] + [0]*len(x)))
+    lo, hi = min(t0, t1), max(t0, t1)
+    point = lambda y: (y[0], list(y[1:]))
+    points = [point(y)]
+    events = []
+    for _ in range(maxsteps):
+        yp = y + h*tau
+        if not lo <= yp[0] <= hi:
+            # land on the end of the interval instead of stepping past it
+            tend = hi if yp[0] > hi else lo
+            s = (tend - y[0]) / (yp[0] - y[0])
+            try:
+                xend = refine_root(lambda *x: G(tend, *x), list(y[1:] + s*(yp[1:] - y[1:])))[0]
+                points.append((tend, xend))
+                break
+            except (ValueError, ZeroDivisionError):
+                res = None
+        else:
+            res = _correct(G, yp, tau, J, maxcorr, tol)
+        if res is not None:
+            z, r, it = res
+            Jz = jacobian(G, z)
+            tnew, Dnew = _tangent(Jz, tau)
+            if fdot(tnew, tau) < 0.8 or norm(z - y) > 2*h:
+                res = None
+        if res is None:
+            h /= 2
+            if h < hmin:
+                events.append(("singular",) + point(y))
+                break
+            continue
+        for (kind, a, b) in (("turning point", tau[0], tnew[0]), ("bifurcation", D, Dnew)):
+            if sign(a) * sign(b) < 0:
+                events.append((kind,) + point(y + (a / (a - b)) * (z - y)))
+        y, J, tau, D = z, Jz, tnew, Dnew
+        points.append(point(y))
+        if it <= 4:
+            h = min(hmax, 1.5*h)
+        elif it >= 6:
+            h /= 2
+    return (points, events)
@@ -6,7 +6,7 @@ Cf. https://erich-friedman.github.io/packing/circovcir
 """
 from mpmath import *
 from shibuya.draw import drawing
-from shibuya.generators import cu
+from shibuya.generators import cu, unitroots
 
 def thassqrt(q):
     return mpc(1-q,2*sqrt(q)) / (1+q)
@@ -143,6 +143,5 @@ def draw_packing(data, outfn, scale=400):
     res = drawing(scale, (2,2), (-1,-1))
     res.add_circle(0, 0, 1.008, {"fill": "#1c92cd"})
     res.add_circle(0, 0, 1, {"fill": "#fff"})
-    for c in centres:
-        res.add_circle(c.real, c.imag, r, {"opacity": "0.1"})
+    res.add_shapes("disc", 2*r, centres, {"opacity": "0.1"})
     res.write(outfn)
@@ -71,6 +71,5 @@ def draw_packing(data, outfn, scale=400):
     res = drawing(scale)
     res.add_rect(-0.008, -0.008, 1.016, 1.016, {"fill": "#1c92cd"})
     res.add_rect(0, 0, 1, 1, {"fill": "#fff"})
-    for c in centres:
-        res.add_circle(c.real, c.imag, r, {"opacity": "0.1"})
+    res.add_shapes("disc", 2*r, centres, {"opacity": "0.1"})
     res.write(outfn)
@@ -0,0 +1,109 @@
+"""
+Distance sets of point sets. The distances between all pairs of points are computed
+in NumPy, a block of rows at a time so that memory stays bounded, and screened
+in floating point; when the points are mpmath numbers the pairs found are then
+confirmed at the working precision. distance_set() clusters the distances and
+counts them, distance_pairs() finds the pairs at integer or given lengths.
+Run as python -m shibuya.distances to time them on a patch of the triangular lattice.
+"""
+import sys
+import time
+import mpmath
+from mpmath import *
+import numpy as np
+
+block_size = 1 << 22
+
+def _complex(points):
+    if isinstance(points, np.ndarray) and points.dtype != object:
+        return points.astype(complex).ravel()
+    return np.array([complex(p) for p in points], dtype=complex)
+
+def _is_mp(points):
+    return not isinstance(points, np.ndarray) and any(isinstance(p, (mpmath.mpf, mpmath.mpc)) for p in points)
+
+def distance_blocks(points):
+    """Yield (r0, D) for blocks of rows of the upper triangle of the points' distance
+    matrix: D[i,j] is the distance between points r0+i and r0+j for r0+i < r0+j
+    and nan otherwise. Each block has about block_size entries."""
+    Z = _complex(points)
+    n = len(Z)
+    rows = max(1, block_size // max(n, 1))
+    for r0 in range(0, n, rows):
+        r1 = min(n, r0+rows)
+        D = abs(Z[r0:r1,None] - Z[None,r0:])
+        D[np.arange(r1-r0)[:,None] >= np.arange(n-r0)[None,:]] = np.nan
+        yield (r0, D)
+
+def distance_set(points, tol=1e-9):
+    """Return the distinct distances between the points and how often each occurs,
+    as two arrays sorted by distance. Distances are clustered by rounding them to
+    multiples of tol and joining adjacent multiples, so distances within tol
+    of each other (or linked by a chain of such) count as one; each cluster
+    is represented by its mean."""
+    keys, counts, sums = [], [], []
+    for (_, D) in distance_blocks(points):
+        d = D[~np.isnan(D)]
+        k, inv, c = np.unique(np.rint(d / tol).astype(np.int64), return_inverse=True, return_counts=True)
+        keys.append(k)
+        counts.append(c)
+        sums.append(np.bincount(inv, weights=d, minlength=len(k)))
+    if not keys:
+        return (np.zeros(0), np.zeros(0, dtype=np.int64))
+    k, inv = np.unique(np.concatenate(keys), return_inverse=True)
+    cluster = np.cumsum(np.diff(k, prepend=k[:1]) > 1)
+    c = np.bincount(cluster[inv], weights=np.concatenate(counts)).astype(np.int64)
+    s = np.bincount(cluster[inv], weights=np.concatenate(sums))
+    return (s / c, c)
+
+def distance_pairs(points, lengths=None, tol=1e-12):
+    """Return the pairs of points at the given lengths, or by default at positive
+    integer lengths, as a sorted list of (i, j, length) with i < j. A pair is at length
+    L if almosteq(distance, L, tol) as in generators.all_unit_distances(). Pairs are
+    screened in floating point with a tolerance of at least 1e-9; if the points are mpmath
+    numbers the candidates are confirmed at the working precision, otherwise
+    the floating-point distances are tested."""
+    exact = _is_mp(points)
+    if lengths is not None:
+        lengths = sorted(lengths)
+        L = np.array([float(l) for l in lengths])
+    stol = max(2*tol, 1e-9)
+    res = []
+    for (r0, D) in distance_blocks(points):
+        with np.errstate(invalid="ignore"):
+            if lengths is None:
+                k = np.rint(D)
+                near = (k >= 1) & (abs(D - k) <= (stol if exact else tol) * np.fmax(D, k))
+            else:
+                k = np.searchsorted((L[1:] + L[:-1]) / 2, D)
+                t = L[k]
+                near = abs(D - t) <= (stol if exact else tol) * np.fmax(np.fmax(D, t), 1)
+        i, j = np.nonzero(near)
+        for (a, b, c) in zip((i + r0).tolist(), (j + r0).tolist(), k[i,j].tolist()):
+            l = int(c) if lengths is None else lengths[c]
+            if not exact or almosteq(abs(points[a] - points[b]), l, tol):
+                res.append((a, b, l))
+    return res
+
+def distance_multiplicities(pairs):
+    """Given the result of distance_pairs(), return a dictionary mapping each
+    length to how many pairs are at that length."""
+    res = {}
+    for (_, _, l) in pairs:
+        res[l] = res.get(l, 0) + 1
+    return res
+
+if __name__ == "__main__":
+    r = int(sys.argv[1]) if len(sys.argv) > 1 else 57
+    w = unitroots(6)[1]
+    points = [a + b*w for a in range(-r, r+1) for b in range(-r, r+1) if abs(a + b) <= r]
+    Z = _complex(points)
+    t = time.perf_counter()
+    d, c = distance_set(Z)
+    print(f"{len(Z)} points, {len(d)} distinct distances in {time.perf_counter()-t:.2f} s")
+    t = time.perf_counter()
+    pairs = distance_pairs(Z)
+    print(f"{len(pairs)} pairs at integer distances in {time.perf_counter()-t:.2f} s")
+    t = time.perf_counter()
+    pairs = distance_pairs(points[:2000], [1, sqrt(3), 2])
+    print(f"{len(pairs)} pairs at 1, sqrt(3), 2 among 2000 mpmath points in {time.perf_counter()-t:.2f} s")
@@ -1,9 +1,73 @@
+import cmath
+import math
 import xml.etree.ElementTree as ET
 
+def fixedstr(n, digits):
+    """Format the integer n, taken in units of 10^-digits, without trailing zeros."""
+    sign = "-" if n < 0 else ""
+    i, f = divmod(abs(n), 10**digits)
+    f = f"{f:0{digits}d}".rstrip("0") if digits else ""
+    return f"{sign}{i}.{f}" if f else f"{sign}{i}"
+
+def trails(n, edges):
+    """Decompose the edges of a graph on n vertices into trails (walks without
+    repeated edges), greedily starting from odd-degree vertices, and return them
+    as lists of vertex indices. Each trail can then be drawn as one polyline.
+    edges may be any iterable of pairs."""
+    adj = [[] for _ in range(n)]
+    k = -1
+    for (k, (a, b)) in enumerate(edges):
+        adj[a].append((b, k))
+        adj[b].append((a, k))
+    used = [False] * (k+1)
+    res = []
+    starts = [v for v in range(n) if len(adj[v]) % 2] + list(range(n))
+    for v in starts:
+        while adj[v]:
+            trail = [v]
+            u = v
+            while adj[u]:
+                w, k = adj[u].pop()
+                if used[k]:
+                    continue
+                used[k] = True
+                trail.append(w)
+                u = w
+            if len(trail) > 1:
+                res.append(trail)
+    return res
+
+def shape_vertices(shape, size, centre=0, angle=0):
+    """Return the vertices of a square of side size or regular hexagon of
+    side size with the given centre, rotated anticlockwise by angle (radians).
+    At angle 0 the side from the first vertex to the second points along +x."""
+    n, w = {"square": (4, 1j), "hexagon": (6, cmath.exp(1j*math.pi/3))}[shape]
+    v1 = -(1 + 1j) / 2 if n == 4 else -w
+    return [complex(centre) + size * v1 * w**k * cmath.exp(1j*angle) for k in range(n)]
+
+def on_side(shape, v1, v2):
+    """Return the placement (centre, angle, side) of the square or regular hexagon
+    having v1 and v2 as consecutive vertices in anticlockwise order,
+    for use with drawing.add_shapes()."""
+    v1, v2 = complex(v1), complex(v2)
+    w = (1 + 1j) / 2 if shape == "square" else cmath.exp(1j*math.pi/3)
+    return (v1 + w*(v2 - v1), cmath.phase(v2 - v1), abs(v2 - v1))
+
+def placement(p, size):
+    """Return the placement p given to drawing.add_shapes() as (centre, angle, size)."""
+    if not isinstance(p, tuple):
+        return (p, 0, size)
+    return p if len(p) == 3 else p + (size,)
+
+xlink = "http://www.w3.org/1999/xlink"
+
 class drawing:
-    def __init__(self, scale=400, canvas=None, offset=None):
+    def __init__(self, scale=400, canvas=None, offset=None, classes=False):
+        """If classes is true, styles are not written inline for each element
+        but interned into CSS classes, one per distinct style."""
         self.scale = scale
         ET.register_namespace("", "http://www.w3.org/2000/svg")
+        ET.register_namespace("xlink", xlink)
         if canvas is None: # (width, height)
             canvas = (1, 1)
         if offset is None: # (x, y)
@@ -11,14 +75,36 @@ class drawing:
         self.root = ET.Element("svg", {"xmlns": "http://www.w3.org/2000/svg", "width": str(canvas[0]*scale), "height": str(canvas[1]*scale),
                 "viewBox": f"{offset[0]*scale} {-(offset[1]+canvas[1])*scale} {canvas[0]*scale} {canvas[1]*scale}"})
         self.tree = ET.ElementTree(self.root)
+        self.classes = None
+        self.defs = None
+        self.defined = {}
+        if classes:
+            self.classes = {}
+            self.stylesheet = ET.SubElement(self.root, "style")
+
+    def style_string(self, styledict):
+        """Serialise styledict, scaling its stroke-width (if any) to output units."""
+        return ";".join(f"{k}:{v*self.scale if k == 'stroke-width' else v}" for (k,v) in styledict.items())
 
-    def add_object(self, tag, mains, styledict=None):
+    def style_class(self, styledict):
+        """Return the name of the CSS class for styledict, creating it
+        the first time this style is seen."""
+        key = tuple(sorted(styledict.items()))
+        name = self.classes.get(key)
+        if name is None:
+            name = self.classes[key] = f"s{len(self.classes)}"
+        return name
+
+    def add_object(self, tag, mains, styledict=None, parent=None):
         attrib = mains.copy()
         if styledict is not None:
-            if "stroke-width" in styledict:
-                styledict["stroke-width"] *= self.scale
-            attrib["style"] = ";".join(f"{k}:{v}" for (k,v) in styledict.items())
-        self.root.append(ET.Element(tag, attrib))
+            if self.classes is None:
+                attrib["style"] = self.style_string(styledict)
+            else:
+                attrib["class"] = self.style_class(styledict)
+        el = ET.Element(tag, attrib)
+        (self.root if parent is None else parent).append(el)
+        return el
 
     def add_circle(self, x, y, r=0.02, styledict=None):
         scale = self.scale
@@ -48,13 +134,122 @@ class drawing:
             styledict = {"fill": "none", "stroke": "#000", "stroke-width": 0.005}
         self.add_path([("M", x1, y1, x2, y2)], styledict)
 
+    def add_edges(self, points, edges, styledict=None, digits=2):
+        """Add the edges (pairs of indices into points, a sequence of (x, y))
+        as a single path. Edges are chained into trails and coordinates are
+        rounded to the given number of decimal places in output units,
+        then written relatively, which makes the path much more compact
+        than separate add_edge() calls."""
+        if styledict is None:
+            styledict = {"fill": "none", "stroke": "#000", "stroke-width": 0.005, "stroke-linejoin": "round"}
+        return self.add_object("path", {"d": self.edges_path(points, edges, digits)}, styledict)
+
+    def edges_path(self, points, edges, digits=2):
+        """Return the path data used by add_edges(). For fixed edges
+        the commands are the same whatever the points, only the numbers change."""
+        grid = self._grid(points, digits)
+        cmds = []
+        cur = (0, 0)
+        for trail in trails(len(points), edges):
+            x, y = grid[trail[0]]
+            cmds.append(f"m{fixedstr(x-cur[0], digits)} {fixedstr(y-cur[1], digits)}l")
+            for v in trail[1:]:
+                nx, ny = grid[v]
+                cmds.append(f"{fixedstr(nx-x, digits)} {fixedstr(ny-y, digits)} ")
+                x, y = nx, ny
+            cur = (x, y)
+        return "".join(cmds).replace(" m", "m").rstrip()
+
+    def add_circles(self, centres, r=0.02, styledict=None, digits=2):
+        """Add circles of radius r at all the centres (x, y) as a single path,
+        each circle being two arcs."""
+        rn = round(r*self.scale * 10**digits)
+        rs = fixedstr(rn, digits)
+        arcs = f"a{rs} {rs} 0 1 0 {fixedstr(2*rn, digits)} 0a{rs} {rs} 0 1 0 {fixedstr(-2*rn, digits)} 0"
+        cmds = []
+        cur = (0, 0)
+        for (x, y) in self._grid(centres, digits):
+            cmds.append(f"m{fixedstr(x-rn-cur[0], digits)} {fixedstr(y-cur[1], digits)}{arcs}")
+            cur = (x-rn, y)
+        return self.add_object("path", {"d": "".join(cmds)}, styledict)
+
+    def add_dots(self, centres, r=0.02, fill="#000", digits=2):
+        """Add filled discs of radius r at all the centres (x, y) as a single path
+        of zero-length round-capped segments, the most compact form of vertex markers."""
+        styledict = {"fill": "none", "stroke": fill, "stroke-width": 2*r, "stroke-linecap": "round"}
+        return self.add_object("path", {"d": self.dots_path(centres, digits)}, styledict)
+
+    def dots_path(self, centres, digits=2):
+        """Return the path data used by add_dots()."""
+        cmds = []
+        cur = (0, 0)
+        for (x, y) in self._grid(centres, digits):
+            cmds.append(f"m{fixedstr(x-cur[0], digits)} {fixedstr(y-cur[1], digits)}h0")
+            cur = (x, y)
+        return "".join(cmds)
+
+    def add_shapes(self, shape, size, placements, styledict=None, digits=2):
+        """Add copies of a disc of diameter size, or a square or regular hexagon
+        of side size (shape being "disc", "square" or "hexagon"), at the
+        placements – each a centre, a pair (centre, angle) as for
+        shape_vertices() or a triple (centre, angle, size) overriding size, as
+        on_side() returns (size may then be None). Each distinct size of the shape is written once,
+        with its style, in <defs>; each copy is a <use> of it."""
+        f = self.scale * 10**digits
+        for p in placements:
+            c, angle, psize = placement(p, size)
+            ident = self._prototype(shape, psize, styledict, digits)
+            c = complex(c)
+            x, y = fixedstr(round(c.real*f), digits), fixedstr(round(-c.imag*f), digits)
+            if angle:
+                attrib = {f"{{{xlink}}}href": f"#{ident}", "transform": f"translate({x} {y})rotate({-math.degrees(angle):.3f})"}
+            else:
+                attrib = {f"{{{xlink}}}href": f"#{ident}", "x": x, "y": y}
+            self.root.append(ET.Element("use", attrib))
+
+    def _prototype(self, shape, size, styledict, digits):
+        """Return the id of the shape of the given size and style in <defs>,
+        writing it there first if needed."""
+        size = float(size)
+        key = (shape, round(size, 12), tuple(styledict.items()) if styledict else ())
+        ident = self.defined.get(key)
+        if ident is None:
+            if self.defs is None:
+                self.defs = ET.Element("defs")
+                self.root.insert(0, self.defs)
+            ident = self.defined[key] = f"{shape}{len(self.defined)}"
+            if shape == "disc":
+                tag, attrib = "circle", {"r": fixedstr(round(size*self.scale/2 * 10**digits), digits)}
+            else:
+                pts = self._grid([(v.real, v.imag) for v in shape_vertices(shape, size)], digits)
+                tag, attrib = "polygon", {"points": " ".join(f"{fixedstr(x, digits)},{fixedstr(y, digits)}" for (x, y) in pts)}
+            self.add_object(tag, {"id": ident, **attrib}, styledict, self.defs)
+        return ident
+
+    def _grid(self, points, digits):
+        """Return points (x, y) in output units as integer multiples of 10^-digits."""
+        f = self.scale * 10**digits
+        return [(round(float(x)*f), round(-float(y)*f)) for (x, y) in points]
+
     def write(self, fn):
+        if self.classes is not None:
+            self.stylesheet.text = "".join(f".{name}{{{self.style_string(dict(key))}}}"
+                                           for (key, name) in self.classes.items())
         self.tree.write(f"{fn}.svg", "unicode")
 
-def draw_graph(graph, outfn, scale=400, pad=0.04):
+def draw_graph(graph, outfn, scale=400, pad=0.04, vertsize=0.02, edgewidth=0.005,
+        vertstyle=None, edgestyle=None, batch=True, surface=drawing):
     """Draw graph, specified as (vertices, edges), writing to outfn.svg.
     One unit in graph's coordinates corresponds to scale pixels in the output;
-    a padding of pad units is applied all around."""
+    a padding of pad units is applied all around.
+    vertsize and edgewidth are the vertex radius and edge width in graph units.
+    vertstyle maps vertex indices, and edgestyle edges (pairs of indices),
+    to dicts of SVG style properties overriding the defaults; each distinct
+    style becomes one CSS class.
+    With batch (the default) all edges of the same style go into one path and
+    likewise for vertices, which looks the same but makes for files several
+    times smaller; otherwise every edge and vertex is a separate element.
+    surface is the class drawn on; pass shibuya.raster.raster to write outfn.png instead."""
     vertices, edges = graph
     reals = [v.real for v in vertices]
     imags = [v.imag for v in vertices]
@@ -62,12 +257,32 @@ def draw_graph(graph, outfn, scale=400, pad=0.04):
     y = min(imags) - pad
     width = max(reals) - min(reals) + 2*pad
     height = max(imags) - min(imags) + 2*pad
-    res = drawing(scale, (width, height), (x, y))
+    res = surface(scale, (width, height), (x, y), classes=True)
 
-    for (i1, i2) in edges:
+    edgebase = {"fill": "none", "stroke": "#000", "stroke-width": edgewidth}
+    estyles = [edgebase if edgestyle is None else {**edgebase, **edgestyle(e)} for e in edges]
+    vstyles = [{} if vertstyle is None else vertstyle(i) or {} for i in range(len(vertices))]
+    if batch:
+        points = [(v.real, v.imag) for v in vertices]
+        egroups = {}
+        for (e, st) in zip(edges, estyles):
+            egroups.setdefault(tuple(st.items()), []).append(e)
+        for (st, es) in egroups.items():
+            res.add_edges(points, es, {**dict(st), "stroke-linejoin": "round"})
+        vgroups = {}
+        for (p, st) in zip(points, vstyles):
+            vgroups.setdefault(tuple(st.items()), []).append(p)
+        for (st, ps) in vgroups.items():
+            if st:
+                res.add_circles(ps, vertsize, dict(st))
+            else:
+                res.add_dots(ps, vertsize)
+        res.write(outfn)
+        return
+    for ((i1, i2), st) in zip(edges, estyles):
         v1 = vertices[i1]
         v2 = vertices[i2]
-        res.add_edge(v1.real, v1.imag, v2.real, v2.imag)
-    for v in vertices:
-        res.add_circle(v.real, v.imag)
+        res.add_edge(v1.real, v1.imag, v2.real, v2.imag, st)
+    for (v, st) in zip(vertices, vstyles):
+        res.add_circle(v.real, v.imag, vertsize, st or None)
     res.write(outfn)
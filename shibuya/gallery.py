@@ -0,0 +1,125 @@
+"""
+A gallery of every constructor in Shibuya: each graph is drawn with draw_graph()
+and each packing or covering with its module's draw_packing(), in worker processes
+with a per-item timeout, and an index.html linking them all is written.
+Rebuilds are incremental: items are keyed by their module's source hash
+(see shibuya.catalogue), so only those whose code changed are redrawn.
+Run as python -m shibuya [outdir].
+"""
+import html
+import io
+import json
+import os
+import signal
+import time
+from contextlib import redirect_stdout
+from importlib import import_module
+from shibuya.catalogue import module_names, constructors, source_hash
+from shibuya.draw import draw_graph
+from shibuya.generators import pool_map
+
+def _alarm(signum, frame):
+    raise TimeoutError("timed out")
+
+def render_item(modname, name, outfn, timeout=None):
+    """Construct the named object, suppressing anything it prints, and draw it
+    to outfn.svg, giving up after timeout seconds (on platforms with SIGALRM).
+    Return a dict describing the outcome."""
+    row = {"module": modname, "name": name, "file": os.path.basename(outfn) + ".svg"}
+    start = time.perf_counter()
+    timed = timeout and hasattr(signal, "setitimer")
+    if timed:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        mod = import_module(modname)
+        with redirect_stdout(io.StringIO()):
+            data = getattr(mod, name)()
+            if hasattr(mod, "draw_packing"):
+                mod.draw_packing(data, outfn)
+            else:
+                draw_graph(data, outfn)
+                row["vertices"], row["edges"] = len(data[0]), len(data[1])
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+def write_index(outdir, rows, failed_modules):
+    """Write index.html in outdir showing the drawings in rows, grouped by module."""
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Shibuya gallery</title>",
+             "<style>body{font-family:sans-serif}figure{display:inline-block;margin:8px;"
+             "text-align:center;vertical-align:top}img{width:200px;height:200px;"
+             "object-fit:contain;border:1px solid #ccc}.error{color:#c00;width:200px}</style>",
+             "</head><body><h1>Shibuya gallery</h1>"]
+    modules = {}
+    for row in rows:
+        modules.setdefault(row["module"], []).append(row)
+    for (modname, modrows) in modules.items():
+        parts.append(f"<h2>{html.escape(modname)}</h2>")
+        for row in modrows:
+            name = html.escape(row["name"])
+            if "error" in row:
+                parts.append(f"<figure><figcaption>{name}</figcaption>"
+                             f"<p class='error'>{html.escape(row['error'])}</p></figure>")
+                continue
+            stats = f" ({row['vertices']} v, {row['edges']} e)" if "vertices" in row else ""
+            f = html.escape(row["file"])
+            parts.append(f"<figure><a href='{f}'><img src='{f}' loading='lazy'></a>"
+                         f"<figcaption>{name}{stats}<br>{row['seconds']:.2f} s</figcaption></figure>")
+    for (modname, err) in failed_modules.items():
+        parts.append(f"<h2>{html.escape(modname)}</h2><p class='error'>{html.escape(err)}</p>")
+    parts.append("</body></html>")
+    with open(os.path.join(outdir, "index.html"), "w") as f:
+        f.write("\n".join(parts))
+
+def build_gallery(outdir="gallery", modules=None, processes=None, timeout=60, cachefn="gallery.json"):
+    """Draw every constructor in modules (full module names, by default all of
+    catalogue.module_names()) into outdir and write index.html there,
+    returning the rows describing each item. processes is the size of
+    the worker pool (default: one per CPU) and timeout the limit in seconds
+    per item. Items whose source hash is unchanged and whose drawing still
+    exists are not redrawn; items that timed out are always retried.
+    The cache and index.html also keep the items of modules not drawn this time."""
+    if modules is None:
+        modules = module_names()
+    os.makedirs(outdir, exist_ok=True)
+    cachepath = os.path.join(outdir, cachefn)
+    try:
+        with open(cachepath) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    keys = {}
+    todo = []
+    failed_modules = {}
+    for modname in modules:
+        try:
+            h = source_hash(modname)
+            names = [name for (name, _) in constructors(modname)]
+        except Exception as e:
+            failed_modules[modname] = f"{type(e).__name__}: {e}"
+            continue
+        for name in names:
+            keys[modname, name] = key = f"{modname}.{name}:{h}"
+            row = cache.get(key)
+            if (row is None or row.get("error", "").startswith("TimeoutError") or
+                    "error" not in row and not os.path.exists(os.path.join(outdir, row["file"]))):
+                outfn = os.path.join(outdir, f"{modname.split('.', 1)[1].replace('.', '-')}-{name}")
+                todo.append((modname, name, outfn, timeout))
+    if todo:
+        for ((modname, name, _, _), row) in zip(todo, pool_map(render_item, todo, processes)):
+            cache[keys[modname, name]] = row
+    rows = [cache[key] for key in keys.values()]
+    # entries of modules outside this run are kept, so the index still shows them
+    merged = {key: row for (key, row) in cache.items() if row["module"] not in modules}
+    merged.update((key, cache[key]) for key in keys.values())
+    with open(cachepath, "w") as f:
+        json.dump(merged, f)
+    order = {modname: i for (i, modname) in enumerate(module_names())}
+    write_index(outdir, sorted(merged.values(), key=lambda row: order.get(row["module"], len(order))),
+                failed_modules)
+    return rows
@@ -1,18 +1,62 @@
 """
 These functions generate simple collections of vertices or edges, or make new ones from old.
 """
-from functools import reduce
+import inspect
+import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, wraps
+import mpmath
 from mpmath import *
+import numpy as np
+from shibuya.distances import distance_pairs
+
+def precision_cache(maxsize=1024):
+    """Decorator factory giving a function of hashable arguments an LRU cache of
+    maxsize results, keyed on the arguments (bound to f's signature with defaults
+    applied, so f(6) and f(n=6) share an entry) together with the working precision
+    and number type, so that results from inside extraprec()/extradps() blocks
+    or backend.float_backend() are kept apart. Lists are returned as copies."""
+    def deco(f):
+        sig = inspect.signature(f)
+        params = sig.parameters.values()
+        # Signature.bind() is slow, so plain positional calls fill in the defaults directly
+        positional = all(p.kind == p.POSITIONAL_OR_KEYWORD for p in params)
+        defaults = tuple(p.default for p in params) if positional else ()
+        required = sum(d is inspect.Parameter.empty for d in defaults)
+        @lru_cache(maxsize)
+        def cached(key, args, kwargs):
+            return f(*args, **dict(kwargs))
+        @wraps(f)
+        def g(*args, **kwargs):
+            if not kwargs and required <= len(args) <= len(defaults):
+                res = cached((mp.prec, mpf), args + defaults[len(args):], ())
+            else:
+                bound = sig.bind(*args, **kwargs)
+                bound.apply_defaults()
+                res = cached((mp.prec, mpf), bound.args, tuple(bound.kwargs.items()))
+            return list(res) if isinstance(res, list) else res
+        g.cache_info = cached.cache_info
+        g.cache_clear = cached.cache_clear
+        return g
+    return deco
+
+# shared tables; modules wanting them import these after "from mpmath import *"
+unitroots = precision_cache()(mpmath.unitroots)
+root = precision_cache()(mpmath.root)
+
+def iter_union_edges(*graphs):
+    """Yield the edges of the disjoint union of the graphs one at a time.
+    Each graph's vertices may be given as just their number."""
+    l = 0
+    for (vertices, edges) in graphs:
+        yield from ((a+l, b+l) for (a, b) in edges)
+        l += vertices if isinstance(vertices, int) else len(vertices)
 
 def disjoint_union(*graphs):
     """Given a list of graphs, construct their disjoint union."""
-    res_vertices = []
-    res_edges = []
-    for (vertices, edges) in graphs:
-        l = len(res_vertices)
-        res_edges.extend((a+l, b+l) for (a, b) in edges)
-        res_vertices.extend(vertices)
-    return (res_vertices, res_edges)
+    graphs = list(graphs)
+    res_vertices = [v for (vertices, _) in graphs for v in vertices]
+    return (res_vertices, list(iter_union_edges(*graphs)))
 
 def cartesian_product2(g1, g2):
     """Given two graphs, construct their Cartesian product.
@@ -37,10 +81,44 @@ def cartesian_product2(g1, g2):
             edges.append((j*m+c, j*m+d))
     return (vertices, edges)
 
+def product_vertices(*vertexlists):
+    """Return the vertices of the Cartesian product of graphs with the given
+    vertices, in the order and with the anchoring of cartesian_product2()."""
+    res = vertexlists[0]
+    for vertices in vertexlists[1:]:
+        anchor = vertices[0]
+        res = [v1 + v2 - anchor for v1 in res for v2 in vertices]
+    return res
+
+def product_edge_blocks(*graphs):
+    """Yield the edges of the Cartesian product of the graphs as n × 2 integer
+    arrays, one for each edge of each factor, in the order cartesian_product()
+    gives them. The product's vertex indices are mixed-radix numbers whose digits,
+    most significant first, are the factors' vertex indices, so only the block
+    being yielded is ever held. Each graph's vertices may be given as just
+    their number, and its edges may be any iterable."""
+    graphs = list(graphs)
+    sizes = [v if isinstance(v, int) else len(v) for (v, _) in graphs]
+    for (k, (_, edges)) in enumerate(graphs):
+        m = sizes[k]
+        S = math.prod(sizes[k+1:])
+        j, t = np.meshgrid(np.arange(math.prod(sizes[:k])), np.arange(S), indexing="ij")
+        base = (j*(m*S) + t).ravel()
+        for (c, d) in edges:
+            yield np.stack([base + c*S, base + d*S], axis=1)
+
+def iter_product_edges(*graphs):
+    """Yield the edges of the Cartesian product of the graphs one at a time,
+    as pairs of ints; see product_edge_blocks()."""
+    for block in product_edge_blocks(*graphs):
+        yield from zip(block[:,0].tolist(), block[:,1].tolist())
+
 def cartesian_product(*graphs):
     """Given a list of graphs, construct their Cartesian product using the
-    conventions in cartesian_product2()."""
-    return reduce(cartesian_product2, graphs)
+    conventions in cartesian_product2(), but computing the final vertex
+    indices directly rather than through the intermediate products."""
+    graphs = list(graphs)
+    return (product_vertices(*(v for (v, _) in graphs)), list(iter_product_edges(*graphs)))
 
 def cu(z1, z2, r1=1, r2=1):
     """Constructs the point at a distance of r1 from z1 and r2 from z2, left of the
@@ -57,21 +135,54 @@ def circumcentre(a, b, c):
     w = (A*(B+C-A), B*(C+A-B), C*(A+B-C))
     return fdot([a, b, c], w) / sum(w)
 
+def cu_array(z1, z2, r1=1, r2=1):
+    """Vectorised cu(): z1, z2, r1 and r2 may be NumPy arrays or sequences of
+    (mpmath) numbers, broadcast against each other, and all the points are
+    constructed at once in floating point. Return (points, valid) where valid
+    is a boolean array marking the constructible points; the others are nan."""
+    z1, z2 = np.asarray(z1, dtype=complex), np.asarray(z2, dtype=complex)
+    r1, r2 = np.asarray(r1, dtype=float), np.asarray(r2, dtype=float)
+    dz = z2 - z1
+    d = abs(dz)
+    valid = (abs(r1-r2) <= d) & (d <= r1+r2) & (d > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.clip((r1*r1 - r2*r2 + d*d) / (2*d*r1), -1, 1)
+        p = z1 + r1 * dz/d * (c + 1j*np.sqrt(1 - c*c))
+    return (np.where(valid, p, np.nan), valid)
+
+def circumcentre_array(a, b, c, tol=1e-12):
+    """Vectorised circumcentre() for broadcast arrays (or sequences) of points.
+    Return (centres, valid) where valid marks the triangles that are not
+    degenerate, i.e. whose squared area relative to the square of their
+    squared side lengths' sum exceeds tol; the other centres are nan."""
+    a, b, c = (np.asarray(z, dtype=complex) for z in (a, b, c))
+    A, B, C = abs(b-c)**2, abs(c-a)**2, abs(a-b)**2
+    wa, wb, wc = A*(B+C-A), B*(C+A-B), C*(A+B-C)
+    s = wa + wb + wc
+    valid = abs(s) > tol * (A+B+C)**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = (a*wa + b*wb + c*wc) / s
+    return (np.where(valid, p, np.nan), valid)
+
+@precision_cache()
 def star_radius(p, q=1):
     """Calculates the radius of the regular star polygon {p/q} with
     unit-length edges. If q=1 the star becomes a polygon."""
     return 0.5 / sinpi(fraction(q,p))
 
+def iter_ring_edges(n, triples):
+    """Yield the edges of ring_edges(n, triples) one at a time."""
+    for (a, b, k) in triples:
+        limit = k if a == b and 2*k == n else n
+        for i in range(limit):
+            yield (i+a*n, (i+k)%n + b*n)
+
 def ring_edges(n, triples):
     """Let there be n*r vertices grouped into r ordered rings of n vertices each.
     Each triple (a, b, k) in triples corresponds to the statement "for 0 <= i <= n, vertex i
     in ring a is connected to vertex i+k in ring b, all indices taken modulo n".
     Return all the edges implied by these statements."""
-    L = []
-    for (a, b, k) in triples:
-        limit = k if a == b and 2*k == n else n
-        L.extend([(i+a*n, (i+k)%n + b*n) for i in range(limit)])
-    return L
+    return list(iter_ring_edges(n, triples))
 
 def symmetrise(vertices, sym):
     """Return all images of the vertices under the specified symmetry,
@@ -81,27 +192,222 @@ def symmetrise(vertices, sym):
         res.extend([conj(v) for v in res])
     return res
 
-def lcf_edges(n, *patterns):
-    """Return edges corresponding to the LCF notation [pattern]^(n/len(pattern)),
-    for each provided pattern. 0 can be used to indicate "no edge"."""
-    res = ring_edges(n, [(0, 0, 1)])
+def iter_lcf_edges(n, *patterns):
+    """Yield the edges of lcf_edges(n, *patterns) one at a time."""
+    yield from iter_ring_edges(n, [(0, 0, 1)])
     for pattern in patterns:
         p = len(pattern)
         for i in range(n):
             j = (i + pattern[i%p]) % n
             if j > i:
-                res.append((i, j))
-    return res
+                yield (i, j)
+
+def lcf_edges(n, *patterns):
+    """Return edges corresponding to the LCF notation [pattern]^(n/len(pattern)),
+    for each provided pattern. 0 can be used to indicate "no edge"."""
+    return list(iter_lcf_edges(n, *patterns))
 
 def all_unit_distances(vertices, tol=1e-12):
-    """Returns the graph formed by inserting all edges of length 1 between the vertices."""
-    n = len(vertices)
-    edges = []
-    for i in range(n):
-        for j in range(i+1, n):
-            if almosteq(abs(vertices[i]-vertices[j]), 1, tol):
-                edges.append((i, j))
-    return (vertices, edges)
+    """Returns the graph formed by inserting all edges of length 1 between the vertices
+    (see distances.distance_pairs())."""
+    return (vertices, [(i, j) for (i, j, _) in distance_pairs(vertices, [1], tol)])
+
+class pointset:
+    """A set of points in which those within tol of an existing point are identified
+    with it (the earliest added, if several are). Points are hashed by the cell of side
+    4*tol containing them, so finding or adding one looks in at most four (on average
+    2.25) cells and takes expected constant time. The points, kept as given (e.g. as
+    mpc), are in the points attribute."""
+    def __init__(self, tol=1e-12, points=()):
+        self.tol = tol
+        self.points = []
+        self._coords = [] # complex versions of the points
+        self._cells = {}
+        self.add_many(points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def find(self, p):
+        """Return the index of the point within tol of p, or None if there is none."""
+        return self._lookup([p], False)[0]
+
+    def add(self, p):
+        """Return the index of the point within tol of p, adding p if there is none."""
+        return self._lookup([p], True)[0]
+
+    def find_many(self, ps):
+        """find() each of ps (which may be a NumPy array), returning the list of results."""
+        return self._lookup(ps, False)
+
+    def add_many(self, ps):
+        """add() each of ps (which may be a NumPy array) in turn, returning the list
+        of indices."""
+        return self._lookup(ps, True)
+
+    def _lookup(self, ps, insert):
+        # the cells to look in are computed for all the points at once
+        Z = np.asarray(ps if isinstance(ps, np.ndarray) else [complex(p) for p in ps], dtype=complex)
+        if not len(Z):
+            return []
+        t, s = self.tol, 4*self.tol
+        I0, I1, J0, J1, I, J = (np.floor(c / s).astype(np.int64).tolist() for c in
+                                (Z.real-t, Z.real+t, Z.imag-t, Z.imag+t, Z.real, Z.imag))
+        ps = Z.tolist() if isinstance(ps, np.ndarray) else ps
+        points, coords, cells = self.points, self._coords, self._cells
+        res = []
+        for (p, z, i0, i1, j0, j1, i, j) in zip(ps, Z.tolist(), I0, I1, J0, J1, I, J):
+            found = None
+            for key in ((i, j),) if i0 == i1 and j0 == j1 else ((i0, j0), (i0, j1), (i1, j0), (i1, j1)):
+                for k in cells.get(key, ()):
+                    if abs(coords[k] - z) <= t and (found is None or k < found):
+                        found = k
+            if found is None and insert:
+                found = len(points)
+                cells.setdefault((i, j), []).append(found)
+                points.append(p)
+                coords.append(z)
+            res.append(found)
+        return res
+
+def _edge_array(edges):
+    return np.array(edges if isinstance(edges, np.ndarray) else list(edges), dtype=np.int64).reshape(-1, 2)
+
+def _remap(edges, index):
+    E = np.sort(np.asarray(index, dtype=np.int64)[_edge_array(edges)], axis=1)
+    return np.unique(E[E[:,0] != E[:,1]], axis=0)
+
+def remap_edges(edges, index):
+    """Return the edges with each vertex v replaced by index[v], as a sorted list
+    without loops or repeated edges (in either orientation)."""
+    E = _remap(edges, index)
+    return list(zip(E[:,0].tolist(), E[:,1].tolist()))
+
+def merge_vertices(graph, tol=1e-12):
+    """Identify the vertices of graph, specified as (vertices, edges), that lie
+    within tol of an earlier vertex, returning the new graph."""
+    vertices, edges = graph
+    P = pointset(tol)
+    index = P.add_many(vertices)
+    return (P.points, remap_edges(edges, index))
+
+def rhombic_tiling(vectors, word=None, faces=False):
+    """Return a rhombic tiling of the zonogon with sides vectors (in counterclockwise
+    order, together with their negatives) as a graph; an integer n stands for the
+    unit vectors at angles k*pi/n (0 <= k < n), whose zonogon is the regular 2n-gon,
+    in float64 (pass unitroots(2*n)[:n] for them at the working precision).
+
+    By default the vertices are 0 and the sums vectors[a] + ... + vectors[b-1] of
+    runs of consecutive vectors, in the order of (a, b), all computed at once in NumPy.
+    Otherwise word, a reduced word for the longest permutation of range(n) (a
+    sequence of the positions i whose entries are swapped), picks the tiling: the path
+    of partial sums of the vectors is swept from the tiling's lower boundary to its
+    upper boundary, each swap adding one rhombus and one vertex.
+    With faces=True the list of rhombi, as quadruples of vertices, is returned too."""
+    vectors = np.exp(1j*np.pi*np.arange(vectors)/vectors).tolist() if isinstance(vectors, int) else list(vectors)
+    n = len(vectors)
+    V = np.empty(n+1, dtype=object if any(isinstance(v, (mpmath.mpf, mpmath.mpc)) for v in vectors) else complex)
+    V[:] = [0] + vectors
+    if word is None:
+        C = np.cumsum(V)
+        a, b = np.triu_indices(n+1, 1)
+        vertices = [0] + (C[b] - C[a]).tolist()
+        index = np.zeros((n+2, n+2), dtype=int) # index[a, a] = 0 for the empty run
+        index[a, b] = np.arange(1, len(a) + 1)
+        # edges add one vector at either end of a run
+        e1 = np.stack([index[a, b], index[a, b+1]], axis=1)[b < n]
+        e2 = np.stack([index[a, b], index[a-1, b]], axis=1)[a >= 1]
+        e0 = np.stack([np.zeros(n, dtype=int), index[np.arange(n), np.arange(1, n+1)]], axis=1)
+        edges = np.concatenate([e0, e1, e2]).tolist()
+        a, b = np.triu_indices(n, 1)
+        rhombi = np.stack([index[a+1, b], index[a, b], index[a, b+1], index[a+1, b+1]], axis=1).tolist()
+    else:
+        vertices = np.cumsum(V).tolist()
+        edges = [(i, i+1) for i in range(n)]
+        rhombi = []
+        perm = list(range(n))
+        path = list(range(n+1))
+        for i in word:
+            if perm[i] > perm[i+1]:
+                raise ValueError("word is not reduced")
+            perm[i], perm[i+1] = perm[i+1], perm[i]
+            k = len(vertices)
+            vertices.append(vertices[path[i]] + vectors[perm[i]])
+            edges.extend([(path[i], k), (k, path[i+2])])
+            rhombi.append((path[i], path[i+1], path[i+2], k))
+            path[i+1] = k
+        if perm != list(range(n))[::-1]:
+            raise ValueError("word does not reverse the vectors")
+    return (vertices, edges, rhombi) if faces else (vertices, edges)
+
+def minkowski_sum(*sets, tol=1e-12):
+    """Return the distinct sums s_1 + s_2 + ... with each s_i taken from sets[i]
+    as a NumPy complex array, identifying sums within tol of each other; duplicates
+    are merged after each summand, so the intermediate sets stay small."""
+    P = np.zeros(1, dtype=complex)
+    for S in sets:
+        S = np.array([complex(s) for s in S])
+        P = np.array(pointset(tol, (P[:,None] + S[None,:]).ravel()).points)
+    return P
+
+def difference_edges(points, vectors, tol=1e-12):
+    """Return the sorted edges (i, j) between points with points[j] - points[i]
+    within tol of one of vectors (or its negative), e.g. the rhombus edges of a
+    Minkowski sum of {0, v} for the unit vectors v."""
+    P = pointset(tol)
+    index = P.add_many(points)
+    Z = np.array(P._coords)
+    edges = set()
+    for v in vectors:
+        for (i, j) in enumerate(P.find_many(Z + complex(v))):
+            if j is not None and j != i:
+                edges.add((min(i, j), max(i, j)))
+    if len(P) != len(index):
+        raise ValueError("points are not distinct to within tol")
+    return sorted(edges)
+
+def constraint_list(res):
+    """Return the constraints of the result of a parametrised function like the
+    *_vertices() helpers, (vertices, constraint, ...) or (vertices, (constraint, ...)),
+    as a list."""
+    return list(res[1]) if len(res) == 2 and isinstance(res[1], (list, tuple)) else list(res[1:])
+
+def pool_map(func, argtuples, processes=None, chunksize=1):
+    """Return [func(*args) for args in argtuples], computed in a pool of the given
+    number of worker processes (None for one per CPU), or serially in this process
+    if processes is 0. func and the arguments must be picklable."""
+    argtuples = list(argtuples)
+    if processes == 0 or not argtuples:
+        return [func(*args) for args in argtuples]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(func, *zip(*argtuples), chunksize=chunksize))
+
+def refine_root(f, x0, maxsteps=30):
+    """Solve f(*x) = 0, where f returns a constraint or sequence of constraints,
+    for x near x0 by Newton's method: first at double precision, then doubling
+    the working precision at each stage up to the current one, so that only the
+    last iteration or two run at full cost. Return (x, steps) where steps lists
+    (precision in bits, iterations) for each stage."""
+    def F(*x):
+        r = f(*x)
+        return list(r) if isinstance(r, (list, tuple, matrix)) else [r]
+    precs = [53]
+    while precs[-1] < mp.prec:
+        precs.append(min(2*precs[-1], mp.prec))
+    x = [mpmathify(t) for t in (x0 if isinstance(x0, (list, tuple)) else [x0])]
+    steps = []
+    for p in precs:
+        with workprec(p):
+            for it in range(1, maxsteps+1):
+                dx = lu_solve(jacobian(F, x), -matrix(F(*x)))
+                x = [a + b for (a, b) in zip(x, dx)]
+                # quadratic convergence: the error is now about the square of this step
+                if norm(dx) <= ldexp(1 + norm(x), -p//2):
+                    break
+            else:
+                raise ValueError(f"Newton's method did not converge at {p} bits")
+        steps.append((p, it))
+    return (x, steps)
 
 def fixparams_unitdist(*x0, edgefunc=all_unit_distances):
     """This decorator factory is applied to a parametrised function returning a pair (vertices, constraints)
@@ -112,9 +418,14 @@ def fixparams_unitdist(*x0, edgefunc=all_unit_distances):
     If a dictionary is the first argument, the decorated function accepts an index into
     this dictionary mapping to initial approximations. Passing no positional arguments
     is a shorthand for a function that just returns vertices, indicating that edgefunc
-    should be applied and nothing more."""
+    should be applied and nothing more.
+
+    Parameters are solved for by refine_root(); its (precision, iterations)
+    report for the last call is kept in the newton_steps attribute of the
+    decorated function, and the initial approximations in its x0 attribute."""
     if not x0:
         def deco(f):
+            @wraps(f, updated=())
             def makegraph():
                 return edgefunc(f())
             return makegraph
@@ -122,15 +433,19 @@ def fixparams_unitdist(*x0, edgefunc=all_unit_distances):
     d = x0[0]
     if isinstance(d, dict):
         def deco(f):
+            @wraps(f, updated=())
             def makegraph(i):
-                xstar = findroot(lambda *x: f(*x)[1], d[i])
+                xstar, makegraph.newton_steps = refine_root(lambda *x: f(*x)[1], d[i])
                 return edgefunc(f(*xstar)[0])
+            makegraph.x0 = d
             return makegraph
         return deco
     def deco(f):
+        @wraps(f, updated=())
         def makegraph():
-            xstar = findroot(lambda *x: f(*x)[1], x0)
+            xstar, makegraph.newton_steps = refine_root(lambda *x: f(*x)[1], x0)
             return edgefunc(f(*xstar)[0])
+        makegraph.x0 = x0
         return makegraph
     return deco
 
@@ -138,6 +453,7 @@ def remove_edges(edgefunc):
     """Decorator factory applied to a graph-producing function, removes edges whose indices
     satisfy the given edge function."""
     def deco(graphfunc):
+        @wraps(graphfunc)
         def makegraph(*args, **kwargs):
             G = graphfunc(*args, **kwargs)
             Ep = list(filter(lambda e: not edgefunc(e), G[1]))
@@ -145,15 +461,66 @@ def remove_edges(edgefunc):
         return makegraph
     return deco
 
+def vertex_mask(n, verts):
+    """Return a boolean array of length n, True at the indices in verts
+    (any iterable of indices 0 <= i < n, or already such a mask)."""
+    if isinstance(verts, np.ndarray) and verts.dtype == bool:
+        if verts.shape != (n,):
+            raise ValueError(f"mask of shape {verts.shape} for {n} vertices")
+        return verts
+    I = np.fromiter(verts, dtype=np.int64)
+    bad = I[(I < 0) | (I >= n)]
+    if len(bad):
+        raise ValueError(f"vertex index {bad[0]} out of range for {n} vertices")
+    mask = np.zeros(n, dtype=bool)
+    mask[I] = True
+    return mask
+
+def induced_subgraph(graph, verts):
+    """Return the subgraph of graph induced by the vertices indexed by verts (indices
+    or a boolean mask), keeping their order. The edges are an m × 2 integer array."""
+    vertices, edges = graph
+    keep = vertex_mask(len(vertices), verts)
+    index = np.cumsum(keep) - 1
+    E = _edge_array(edges)
+    E = index[E[keep[E].all(axis=1)]]
+    return ([vertices[i] for i in np.flatnonzero(keep).tolist()], E)
+
 def delete_vertices(graph, dverts):
     """Delete the vertices indexed by dverts from graph; return the resulting graph."""
+    vertices, E = induced_subgraph(graph, ~vertex_mask(len(graph[0]), dverts))
+    return (vertices, tuple(zip(E[:,0].tolist(), E[:,1].tolist())))
+
+def delete_vertices_many(graph, dsets):
+    """delete_vertices() for each of dsets, returning the list of graphs with
+    edges as arrays like induced_subgraph(). Which vertices and edges survive
+    is worked out for all the deletion sets at once."""
+    vertices, edges = graph
+    dsets = list(dsets)
+    keep = np.ones((len(dsets), len(vertices)), dtype=bool)
+    for (row, dverts) in enumerate(dsets):
+        keep[row] = ~vertex_mask(len(vertices), dverts)
+    index = np.cumsum(keep, axis=1) - 1
+    E = _edge_array(edges)
+    alive = keep[:,E[:,0]] & keep[:,E[:,1]]
+    return [([vertices[i] for i in np.flatnonzero(k).tolist()], ind[E[a]])
+            for (k, ind, a) in zip(keep, index, alive)]
+
+def contract(graph, pairs):
+    """Identify the two vertices of each of pairs (for instance some edges of
+    graph, which are thereby contracted). Each merged vertex is placed at the
+    first of the vertices it replaces and the vertices keep their order; the
+    edges, an m × 2 integer array, are sorted and without loops or repeats."""
     vertices, edges = graph
-    remverts = list(filter(lambda x: x not in dverts, range(len(vertices))))
-    vmap = {v: n for (n, v) in enumerate(remverts)}
-    nvertices = list(map(vertices.__getitem__, remverts))
-    nedges = []
-    for (a, b) in edges:
-        if a in dverts or b in dverts:
-            continue
-        nedges.append((vmap[a], vmap[b]))
-    return (nvertices, tuple(nedges))
+    parent = list(range(len(vertices)))
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+    for (a, b) in pairs:
+        a, b = find(a), find(b)
+        parent[max(a, b)] = min(a, b)
+    roots = np.array([find(v) for v in range(len(vertices))], dtype=np.int64)
+    firsts, index = np.unique(roots, return_inverse=True)
+    return ([vertices[i] for i in firsts.tolist()], _remap(edges, index))
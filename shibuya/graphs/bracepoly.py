@@ -4,7 +4,8 @@ All graphs are Laman unless otherwise stated; if such a graph has v vertices
 it has 2v-3 edges.
 """
 from mpmath import *
-from shibuya.generators import cu, star_radius, ring_edges, all_unit_distances, remove_edges, delete_vertices
+from shibuya.generators import (cu, star_radius, ring_edges, all_unit_distances, remove_edges, delete_vertices,
+        unitroots, root, pointset)
 from shibuya.graphs.rigidity import jacobian
 
 def khodulyov_square():
@@ -194,11 +195,7 @@ def rigid_tridecagon():
         return [[q0, q1, q2, q3, q4, q5, q6], [rl0, rl1, rl2, rl3, rr0, rr1, rr2, rr3]]
     bridges = [bridge(i, d) for (i, d) in ((5, 1), (5, -1), (0, 1), (0, -1), (-5, 1))]
     qs, rs = zip(*bridges)
-    unique_qs = [qs[0][0]]
-    for qbridge in qs:
-        for q in qbridge:
-            if min(abs(q-uq) for uq in unique_qs) > 1e-12:
-                unique_qs.append(q)
+    unique_qs = pointset(1e-12, [q for qbridge in qs for q in qbridge]).points
     vertices = p + unique_qs + [r for rset in rs for r in rset]
     return all_unit_distances(vertices)
 
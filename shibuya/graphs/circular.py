@@ -2,8 +2,7 @@
 Functions to draw graphs with a distinctly circular layout.
 They are not always unit-distance or integral, obviously.
 """
-from mpmath import root, unitroots
-from shibuya.generators import star_radius, ring_edges, lcf_edges, cartesian_product
+from shibuya.generators import star_radius, ring_edges, lcf_edges, cartesian_product, unitroots, root
 
 def circulant(n, taps):
     """Return the circulant graph on n vertices with offsets given by taps.
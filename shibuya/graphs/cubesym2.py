@@ -5,7 +5,7 @@ which sorts by arc-transitivity, not Foster's list.
 """
 from mpmath import *
 from shibuya.generators import (cu, star_radius, fixparams_unitdist,
-        symmetrise, remove_edges)
+        symmetrise, remove_edges, unitroots, root)
 
 @fixparams_unitdist()
 def f104a():
@@ -1,7 +1,9 @@
 """
 Functions to automatically search for unit-distance embeddings of graphs.
-For maximal speed, NumPy is used.
+For maximal speed, NumPy is used. Run as python -m shibuya.graphs.embeddingsearch
+to check the grid-based crossing search against testing all pairs of edges.
 """
+import sys
 import numpy as np
 from math import gcd
 from os.path import expanduser
@@ -241,3 +243,135 @@ def beauty_factor(G):
             else:
                 dists.extend((abs(a), abs(u-w)))
     return min(dists)
+
+def _cross(a, b):
+    return a.real*b.imag - a.imag*b.real
+
+def _point_segment_dist(p, a, b):
+    d = b - a
+    l2 = (d*d.conjugate()).real
+    t = np.clip(((p-a)*d.conjugate()).real / np.where(l2 > 0, l2, 1), 0, 1)
+    return abs(p - a - t*d)
+
+def _candidate_pairs(Z, E, tol):
+    """Return the pairs (s, t), s < t, of segments of the k × m complex array
+    of endpoints Z (segment s being E[s % m] in embedding s // m) that, grown by tol,
+    share a cell of a grid as fine as the median segment length. Each segment is cut
+    into pieces no longer than a cell and a piece covers the cells of its bounding box,
+    so the cells a segment covers grow linearly with its length; the cells are coarsened
+    if the segments would otherwise cover more than 16 cells each on average."""
+    k, m = Z.shape[0], len(E)
+    A, B = Z[:,E[:,0]].ravel(), Z[:,E[:,1]].ravel()
+    lengths = abs(B - A)
+    lengths[~np.isfinite(lengths)] = 0
+    h = max(np.median(lengths), lengths.sum() / (16*len(lengths))) + tol if len(lengths) else 0
+    if not h > 0:
+        h = 1.0
+    pieces = np.maximum(np.ceil(lengths / h).astype(np.int64), 1)
+    seg = np.repeat(np.arange(k*m), pieces)
+    j = np.arange(len(seg)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    A, D = A[seg], (B - A)[seg] / pieces[seg]
+    A, B = A + j*D, A + (j+1)*D
+    x0, x1 = (np.floor((f(A.real, B.real) + s) / h).astype(np.int64) for (f, s) in ((np.minimum, -tol), (np.maximum, tol)))
+    y0, y1 = (np.floor((f(A.imag, B.imag) + s) / h).astype(np.int64) for (f, s) in ((np.minimum, -tol), (np.maximum, tol)))
+    nx, ny = x1 - x0 + 1, y1 - y0 + 1
+    counts = nx * ny
+    p = np.repeat(np.arange(len(seg)), counts)
+    r = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    seg, cx, cy = seg[p], x0[p] + r % nx[p], y0[p] + r // nx[p]
+    # consecutive pieces of a segment share cells; keep each segment once per cell
+    order = np.lexsort((seg, cy, cx, seg // m))
+    seg, cx, cy = seg[order], cx[order], cy[order]
+    new = np.ones(len(seg), dtype=bool)
+    new[1:] = (seg[1:] != seg[:-1]) | (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])
+    seg, cx, cy = seg[new], cx[new], cy[new]
+    emb = seg // m
+    pairs = []
+    for d in range(1, len(seg)):
+        same = (emb[d:] == emb[:-d]) & (cx[d:] == cx[:-d]) & (cy[d:] == cy[:-d])
+        if not same.any():
+            break
+        pairs.append(np.stack([seg[:-d][same], seg[d:][same]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    P = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(P, axis=0)
+
+def crossings_many(edges, embeddings, tol=1e-9, touches=False):
+    """Given a graph's edges and a k × n array of embeddings of its vertices (each row
+    the complex positions of the vertices), find the pairs of edges that cross in each
+    embedding, using a grid to avoid testing far-apart edges. Edges cross if each has
+    its ends on opposite sides of the other's line, by more than tol; edges sharing
+    a vertex never cross. With touches=True, pairs of edges not sharing a vertex that
+    come within tol of each other without crossing (for instance a vertex lying on an
+    edge, or two coincident vertices) are included too.
+    Return a list of k arrays of pairs of edge indices (i, j), i < j, sorted."""
+    E = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    Z = np.asarray(embeddings)
+    Z = (np.vectorize(complex, otypes=[complex])(Z) if Z.dtype == object else Z.astype(complex)).reshape(len(Z), -1)
+    if not len(E):
+        return [np.zeros((0, 2), dtype=np.int64) for _ in Z]
+    return _test_pairs(Z, E, _candidate_pairs(Z, E, tol), tol, touches)
+
+def _test_pairs(Z, E, P, tol, touches):
+    """crossings_many() for the embeddings Z (a k × n complex array) and edges E
+    (an m × 2 array), testing only the sorted candidate pairs P of segments
+    numbered as in _candidate_pairs()."""
+    m = len(E)
+    emb, (i, j) = P[:,0] // m, (P % m).T
+    Ei, Ej = E[i], E[j]
+    keep = (Ei[:,:,None] != Ej[:,None,:]).all(axis=(1, 2))
+    emb, i, j, Ei, Ej = emb[keep], i[keep], j[keep], Ei[keep], Ej[keep]
+    p1, p2, q1, q2 = Z[emb,Ei[:,0]], Z[emb,Ei[:,1]], Z[emb,Ej[:,0]], Z[emb,Ej[:,1]]
+    lp, lq = abs(p2 - p1), abs(q2 - q1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dq1, dq2 = _cross(p2-p1, q1-p1) / lp, _cross(p2-p1, q2-p1) / lp
+        dp1, dp2 = _cross(q2-q1, p1-q1) / lq, _cross(q2-q1, p2-q1) / lq
+    cross = ((np.minimum(dq1, dq2) < -tol) & (np.maximum(dq1, dq2) > tol) &
+             (np.minimum(dp1, dp2) < -tol) & (np.maximum(dp1, dp2) > tol))
+    if touches:
+        dist = np.minimum.reduce([_point_segment_dist(q1, p1, p2), _point_segment_dist(q2, p1, p2),
+                                  _point_segment_dist(p1, q1, q2), _point_segment_dist(p2, q1, q2)])
+        cross |= dist <= tol
+    emb, i, j = emb[cross], i[cross], j[cross]
+    bounds = np.searchsorted(emb, np.arange(len(Z)+1))
+    return [np.stack([i[a:b], j[a:b]], axis=1) for (a, b) in zip(bounds, bounds[1:])]
+
+def crossings(G, tol=1e-9, touches=False):
+    """Return the pairs of crossing edges of the graph G as an array; see crossings_many()."""
+    return crossings_many(G[1], [G[0]], tol, touches)[0]
+
+def crossing_counts(edges, embeddings, tol=1e-9):
+    """Return the number of crossings in each of the embeddings of the graph
+    with the given edges, as an array; see crossings_many()."""
+    return np.array([len(P) for P in crossings_many(edges, embeddings, tol)])
+
+def is_matchstick(G, tol=1e-9):
+    """Return whether G is drawn as a matchstick graph, with no two edges
+    crossing or touching except at shared vertices."""
+    return not len(crossings(G, tol, True))
+
+if __name__ == "__main__":
+    # the grid must find exactly the crossings that testing all pairs finds,
+    # including for segments of very different lengths
+    def mixed(n, L):
+        """n unit edges scattered over an L × L square and its two diagonals."""
+        P = rng.uniform(0, L, n) + 1j*rng.uniform(0, L, n)
+        V = np.concatenate([P, P + np.exp(2j*np.pi*rng.uniform(size=n)), [0, L*(1+1j), L, L*1j]])
+        return (V, [(i, n+i) for i in range(n)] + [(2*n, 2*n+1), (2*n+2, 2*n+3)])
+    V = rng.uniform(0, 8, (5, 60)) + 1j*rng.uniform(0, 8, (5, 60))
+    cases = [("random", [(a, b) for a in range(60) for b in range(a+1, 60) if rng.uniform() < 0.08], V)]
+    cases += [(f"mixed L = {L:g}", E, [V, V*1j]) for L in (30, 1e3, 1e5) for (V, E) in [mixed(200, L)]]
+    failed = 0
+    for (name, E, V) in cases:
+        E, Z = np.array(E), np.array(V)
+        pairs = np.stack(np.triu_indices(len(E), 1), axis=1)
+        P = np.concatenate([e*len(E) + pairs for e in range(len(Z))])
+        for touches in (False, True):
+            grid = crossings_many(E, Z, touches=touches)
+            brute = _test_pairs(Z, E, P, 1e-9, touches)
+            ok = all(np.array_equal(a, b) for (a, b) in zip(grid, brute))
+            failed += not ok
+            print(f"{name}, touches={touches}: {sum(map(len, grid))} pairs" + ("" if ok else " DIFFER"))
+    if failed:
+        sys.exit(f"{failed} cases differ from testing all pairs")
@@ -3,9 +3,9 @@ The I-graphs are always unit-distance. The functions here generate such embeddin
 and include a convenience function for generalised Petersen graphs.
 """
 from math import gcd
-from mpmath import sqrt, root, unitroots, almosteq
+from mpmath import sqrt, almosteq
 from shibuya.generators import (disjoint_union, cartesian_product2,
-        cu, star_radius, ring_edges)
+        cu, star_radius, ring_edges, unitroots, root)
 
 def igraph(n, j, k):
     """Return a unit-distance embedding of the I-graph (n,j,k), either directly
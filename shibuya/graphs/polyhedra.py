@@ -4,7 +4,7 @@ if there are multiple higher-degree vertices it likely doesn't.
 """
 from mpmath import *
 from shibuya.generators import (cu, ring_edges, star_radius,
-        fixparams_unitdist, symmetrise, remove_edges)
+        fixparams_unitdist, symmetrise, remove_edges, root)
 
 def tetrahedron():
     """Return the integral embedding of the tetrahedral graph with shortest
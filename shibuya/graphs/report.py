@@ -0,0 +1,92 @@
+"""
+A rigidity report over the graph catalogue: for every constructor in the given modules,
+the vertex and edge counts, Laman counts, infinitesimal rigidity rank, degrees of freedom
+and maximum deviation of edge lengths from 1, with the time taken to construct each graph.
+Constructors are run in worker processes and results are cached by source hash,
+so only graphs whose modules (or their dependencies) changed are recomputed.
+Run as python -m shibuya.graphs.report [outdir].
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from importlib import import_module
+from shibuya.catalogue import constructors, source_hash
+from shibuya.generators import pool_map
+from shibuya.graphs.stress import equilibrium_stresses
+
+report_modules = ("bracepoly", "pegg", "unitdist", "cubesym", "cubesym2")
+fields = ("module", "name", "vertices", "edges", "laman_edges", "excess_edges",
+          "rank", "dof", "max_deviation", "seconds", "error")
+
+def graph_stats(graph):
+    """Return the report's statistics for a single graph."""
+    vertices, edges = graph
+    nv, ne = len(vertices), len(edges)
+    rank = equilibrium_stresses(graph)[0]
+    laman = max(2*nv - 3, 0)
+    dev = max((abs(abs(complex(vertices[a]) - complex(vertices[b])) - 1) for (a, b) in edges), default=0)
+    return {"vertices": nv, "edges": ne, "laman_edges": laman, "excess_edges": ne - laman,
+            "rank": rank, "dof": laman - rank, "max_deviation": dev}
+
+def report_row(modname, name):
+    """Construct the named graph, suppressing anything it prints,
+    and return its row of the report."""
+    row = {"module": modname.rsplit(".", 1)[-1], "name": name}
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            G = getattr(import_module(modname), name)()
+        row["seconds"] = time.perf_counter() - start
+        row.update(graph_stats(G))
+    except Exception as e:
+        row["seconds"] = time.perf_counter() - start
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+def rigidity_report(outdir=".", modules=report_modules, processes=None, cachefn="report-cache.json"):
+    """Write report.csv and report.json into outdir, covering all constructors in
+    the given shibuya.graphs modules, and return the rows. processes is the size
+    of the worker pool (default: one per CPU). Results whose module source hash
+    is unchanged are taken from the cache file in outdir, which keeps the
+    entries of graphs outside this run."""
+    os.makedirs(outdir, exist_ok=True)
+    cachepath = os.path.join(outdir, cachefn)
+    try:
+        with open(cachepath) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    keys = {}
+    todo = []
+    for m in modules:
+        modname = f"shibuya.graphs.{m}"
+        h = source_hash(modname)
+        for (name, _) in constructors(modname):
+            keys[modname, name] = key = f"{modname}.{name}:{h}"
+            if key not in cache:
+                todo.append((modname, name))
+    if todo:
+        for ((modname, name), row) in zip(todo, pool_map(report_row, todo, processes)):
+            cache[keys[modname, name]] = row
+    rows = [cache[key] for key in keys.values()]
+    # keep other graphs' entries, dropping only the stale ones of graphs in this run
+    wanted = set(keys.values())
+    current = {key.rsplit(":", 1)[0] for key in wanted}
+    cache = {key: row for (key, row) in cache.items()
+             if key in wanted or key.rsplit(":", 1)[0] not in current}
+    with open(cachepath, "w") as f:
+        json.dump(cache, f)
+    with open(os.path.join(outdir, "report.json"), "w") as f:
+        json.dump(rows, f, indent=1)
+    with open(os.path.join(outdir, "report.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+if __name__ == "__main__":
+    rigidity_report(sys.argv[1] if len(sys.argv) > 1 else ".")
@@ -1,4 +1,6 @@
+from collections import OrderedDict
 from mpmath import *
+from shibuya.generators import pool_map
 
 def rigidity_matrix(graph):
     """Return the rigidity matrix of the given graph.
@@ -14,26 +16,63 @@ def rigidity_matrix(graph):
         A[r,2*i2+1] = -dimag
     return A
 
-def jacobian(f, x0):
+class component:
+    """Picklable replacement for lambda *x: f(*x)[index], for use with the
+    processes argument of jacobian() and hessian(); f must itself be picklable,
+    i.e. defined at the top level of a module. index may also be a slice."""
+    def __init__(self, f, index):
+        self.f = f
+        self.index = index
+
+    def __call__(self, *x):
+        return self.f(*x)[self.index]
+
+def _jacobian_column(f, x0, j, prec, addprec=10):
+    """Return column j of the Jacobian of f at x0 at the given precision.
+    This is the same central difference diff() would take for each entry,
+    but f is evaluated only twice for the whole column."""
+    with workprec((prec+2*addprec) * 2):
+        h = ldexp(1, -prec-addprec)
+        xp = list(x0)
+        xm = list(x0)
+        xp[j] += h
+        xm[j] -= h
+        fp, fm = f(*xp), f(*xm)
+        col = [(a - b) / (2*h) for (a, b) in zip(fp, fm)]
+    with workprec(prec):
+        return [+z for z in col]
+
+def _hessian_entry(f, x0, dvec, prec):
+    with workprec(prec):
+        return diff(f, x0, dvec)
+
+def jacobian(f, x0, processes=None):
     """Construct the Jacobian matrix of the (possibly multivariate)
-    function f at x0."""
-    n, m = len(x0), len(f(*x0))
+    function f at x0. If processes is given the columns are computed
+    in a pool of that many processes, in which case f must be picklable
+    (see component)."""
+    n = len(x0)
+    x0 = [mpmathify(x) for x in x0]
+    cols = pool_map(_jacobian_column, [(f, x0, j, mp.prec) for j in range(n)], 0 if processes is None else processes)
+    m = len(cols[0])
     J = zeros(m,n)
-    for i in range(m):
-        fi = lambda *x: f(*x)[i]
-        for j in range(n):
-            dvec = tuple(int(k == j) for k in range(n))
-            J[i,j] = diff(fi, x0, dvec)
+    for (j, col) in enumerate(cols):
+        for i in range(m):
+            J[i,j] = col[i]
     return J
 
-def hessian(f, x0):
-    """Construct the Hessian matrix of the R^n -> R function f at x0."""
+def hessian(f, x0, processes=None):
+    """Construct the Hessian matrix of the R^n -> R function f at x0.
+    processes has the same meaning as in jacobian(); each entry on or above
+    the diagonal is then a separate task."""
     n = len(x0)
+    x0 = tuple(x0)
+    pairs = [(i, j) for i in range(n) for j in range(i, n)]
+    dvecs = [tuple(int(k == i) + int(k == j) for k in range(n)) for (i, j) in pairs]
+    entries = pool_map(_hessian_entry, [(f, x0, dvec, mp.prec) for dvec in dvecs], 0 if processes is None else processes)
     H = zeros(n,n)
-    for i in range(n):
-        for j in range(n):
-            dvec = tuple(int(k == i) + int(k == j) for k in range(n))
-            H[i,j] = diff(f, x0, dvec)
+    for ((i, j), h) in zip(pairs, entries):
+        H[i,j] = H[j,i] = h
     return H
 
 def findroot_svd(f, x0, maxsteps=20, normlimit=1e-12):
@@ -57,3 +96,133 @@ def findroot_svd(f, x0, maxsteps=20, normlimit=1e-12):
     if fdot(fx, fx) >= normlimit:
         raise ValueError(f"no convergence in {maxsteps} steps")
     return x
+
+def _nullspace_hessians(f, x0, N, addprec=10):
+    """Evaluate the Hessians of every component of f at x0, restricted to the
+    space spanned by the columns of N, with one central-difference stencil
+    shared by all components. Only 2k^2+1 evaluations of f are needed
+    for a k-column N, independent of len(x0)."""
+    k = N.cols
+    prec = mp.prec
+    with workprec((prec+2*addprec) * 3):
+        h = ldexp(1, -prec-addprec)
+        x = matrix(x0)
+        def g(*c):
+            return f(*(x + N*matrix(c)))
+        zero = [0]*k
+        def g_at(steps):
+            c = list(zero)
+            for (i, s) in steps:
+                c[i] += s*h
+            return g(*c)
+        centre = g_at(())
+        m = len(centre)
+        Hs = [zeros(k,k) for _ in range(m)]
+        for i in range(k):
+            plus, minus = g_at(((i, 2),)), g_at(((i, -2),))
+            for r in range(m):
+                Hs[r][i,i] = (plus[r] - 2*centre[r] + minus[r]) / (4*h*h)
+            for j in range(i):
+                a, b, c, d = (g_at(((i, si), (j, sj))) for (si, sj) in ((1, 1), (1, -1), (-1, 1), (-1, -1)))
+                for r in range(m):
+                    Hs[r][i,j] = Hs[r][j,i] = (a[r] - b[r] - c[r] + d[r]) / (4*h*h)
+    return Hs
+
+def _zero_directions(H, tol):
+    """Return the angles in [0, pi) of the real directions along which
+    the binary quadratic form H vanishes, or None if H is itself zero."""
+    a, b, c = H[0,0], H[0,1], H[1,1]
+    if max(abs(a), abs(b), abs(c)) <= tol:
+        return None
+    if abs(c) <= tol:
+        dirs = [pi/2]
+        if abs(b) > tol:
+            dirs.append(atan(-a/(2*b)) % pi)
+        return dirs
+    disc = b*b - a*c
+    if disc < -tol:
+        return []
+    s = sqrt(max(disc, 0))
+    return [atan(m) % pi for m in ((-b+s)/c, (-b-s)/c)]
+
+_certificates = OrderedDict()
+certificate_cache_size = 128
+
+def second_order_certificate(f, x0, tol=None):
+    """Try to certify that x0 is an isolated solution of f(x) = 0, where
+    f is a (possibly multivariate) function returning a tuple of constraints,
+    using the second-order test of brace11gonproof.py done once and for all.
+
+    The Jacobian and its SVD are computed once, giving the nullspace N (the
+    first-order flexes) and the cokernel (self-stresses of the constraints).
+    The Hessians of all constraints restricted to N are then evaluated in one
+    batched stencil and combined with each self-stress; x0 is second-order
+    rigid if no flex makes all these quadratic forms vanish, which is certain if
+    one of them is definite or, when N is two-dimensional, if their zero
+    directions have no common member.
+
+    The result is a dict whose "rigid" entry is True, False (x0 lies on
+    a smooth curve of solutions) or None (the test is inconclusive),
+    with "reason" explaining the verdict and the intermediate matrices
+    under the other keys. Certificates are cached per (f, x0, tol) at the
+    highest precision seen so far; asking again at the same or a lower
+    precision returns the cached certificate, and a higher-precision run
+    reuses the nullity found before instead of guessing the rank anew.
+    Only the certificate_cache_size most recently used ones are kept."""
+    key = (f, tuple(x0), tol)
+    cached = _certificates.get(key)
+    if cached is not None:
+        _certificates.move_to_end(key)
+        if cached["prec"] >= mp.prec:
+            return cached
+    J = jacobian(f, x0)
+    m, n = J.rows, J.cols
+    U, S, V = svd_r(J, full_matrices=True)
+    if tol is None:
+        tol = eps * max(m,n) * max(max(S), 1)
+    if cached is not None:
+        rank = n - cached["nullity"]
+    else:
+        rank = sum(1 for s in S if s > tol)
+    N = V[rank:,:].T if rank < n else zeros(n,0)
+    C = U[:,rank:] if rank < m else zeros(m,0)
+    res = {"prec": mp.prec, "nullity": n - rank, "singular_values": S,
+           "nullspace": N, "cokernel": C, "hessians": [], "stress_hessians": []}
+    _certificates[key] = res
+    _certificates.move_to_end(key)
+    while len(_certificates) > certificate_cache_size:
+        _certificates.popitem(last=False)
+    if rank == n:
+        res["rigid"], res["reason"] = True, "first-order rigid"
+        return res
+    if rank == m:
+        res["rigid"], res["reason"] = False, "Jacobian has full row rank, so solutions form a manifold"
+        return res
+    Hs = _nullspace_hessians(f, x0, N)
+    SHs = [sum((C[r,s]*Hs[r] for r in range(m)), zeros(N.cols)) for s in range(C.cols)]
+    res["hessians"], res["stress_hessians"] = Hs, SHs
+    htol = sqrt(eps) * max(max(mnorm(H, 1) for H in Hs), 1)
+    for (s, H) in enumerate(SHs):
+        E = eigsy(H, eigvals_only=True)
+        if min(E) > htol or max(E) < -htol:
+            res["rigid"], res["reason"] = True, f"stress {s} has a definite Hessian"
+            return res
+    if N.cols == 1:
+        if max(abs(H[0,0]) for H in SHs) > htol:
+            res["rigid"], res["reason"] = True, "the flex is blocked by a stress"
+            return res
+    elif N.cols == 2:
+        common = None
+        for H in SHs:
+            dirs = _zero_directions(H, htol)
+            if dirs is None:
+                continue
+            if common is None:
+                common = dirs
+            else:
+                common = [t for t in common if any(abs(t-u) <= htol or abs(abs(t-u)-pi) <= htol for u in dirs)]
+        if common is not None and not common:
+            res["rigid"], res["reason"] = True, "the stresses' zero directions have no common member"
+            return res
+    res["rigid"], res["reason"] = None, "no definite or separating stress found"
+    return res
@@ -4,7 +4,7 @@ including the Tietze graph.
 """
 from mpmath import *
 from shibuya.generators import (cu, star_radius, ring_edges,
-        all_unit_distances, fixparams_unitdist, symmetrise)
+        all_unit_distances, fixparams_unitdist, symmetrise, unitroots, root)
 
 def tietze():
     """Return a unit-distance embedding of Tietze's graph."""
@@ -0,0 +1,101 @@
+"""
+Equilibrium stresses of frameworks, i.e. the left nullspace of the rigidity matrix,
+and what follows from them: redundant edges and Connelly's global rigidity criterion.
+Everything here is done in floating point with NumPy, so that frameworks with
+thousands of vertices can be handled in seconds; rigidity.py has the exact tools.
+"""
+import numpy as np
+rng = np.random.default_rng()
+
+def float_rigidity_matrix(graph):
+    """Return the rigidity matrix of graph (see rigidity.rigidity_matrix())
+    as a NumPy array."""
+    vertices, edges = graph
+    z = np.array([complex(v) for v in vertices])
+    E = np.array(edges, dtype=int).reshape(-1, 2)
+    d = z[E[:,0]] - z[E[:,1]]
+    rows = np.arange(len(E))
+    A = np.zeros((len(E), 2*len(z)))
+    A[rows,2*E[:,0]] = d.real
+    A[rows,2*E[:,0]+1] = d.imag
+    A[rows,2*E[:,1]] = -d.real
+    A[rows,2*E[:,1]+1] = -d.imag
+    return A
+
+def pinned_columns(vertices):
+    """Return the three columns of the rigidity matrix that can be deleted to
+    remove the trivial motions: both coordinates of vertex 0 and the coordinate
+    of the vertex farthest from it that rotation about vertex 0 moves most.
+    Deleting them preserves the column space, hence the stresses."""
+    z = np.array([complex(v) for v in vertices])
+    b = np.argmax(abs(z - z[0]))
+    d = z[b] - z[0]
+    return [0, 1, 2*b + int(abs(d.real) > abs(d.imag))]
+
+def equilibrium_stresses(graph, tol=1e-9):
+    """Return (rank, S) where rank is the rank of graph's rigidity matrix and
+    the columns of S form an orthonormal basis of its equilibrium stresses
+    (self-stresses). A QR factorisation of the pinned rigidity matrix is used
+    when it has full column rank, as happens for every rigid framework;
+    otherwise the SVD is used."""
+    vertices, edges = graph
+    A = float_rigidity_matrix(graph)
+    if len(vertices) > 1:
+        A = np.delete(A, pinned_columns(vertices), axis=1)
+    m, k = A.shape
+    if m >= k:
+        Q, R = np.linalg.qr(A, mode="complete")
+        diag = abs(np.diag(R))
+        if k == 0 or diag.min() > tol * diag.max():
+            return (k, Q[:,k:])
+    U, Sigma, _ = np.linalg.svd(A)
+    rank = int((Sigma > tol * Sigma.max()).sum()) if len(Sigma) else 0
+    return (rank, U[:,rank:])
+
+def stress_matrix(graph, omega):
+    """Return the stress matrix (a weighted Laplacian) of the stress omega,
+    given as one coefficient per edge."""
+    vertices, edges = graph
+    E = np.array(edges, dtype=int).reshape(-1, 2)
+    Omega = np.zeros((len(vertices), len(vertices)))
+    np.add.at(Omega, (E[:,0], E[:,1]), -omega)
+    np.add.at(Omega, (E[:,1], E[:,0]), -omega)
+    np.add.at(Omega, (E[:,0], E[:,0]), omega)
+    np.add.at(Omega, (E[:,1], E[:,1]), omega)
+    return Omega
+
+def redundant_edges(graph, S=None, tol=1e-9):
+    """Return the edges of graph lying in the support of some equilibrium stress,
+    i.e. those whose removal does not lower the rigidity matrix's rank.
+    If graph is rigid these are exactly the edges that can be removed
+    singly while keeping it rigid. S is a stress basis as returned by
+    equilibrium_stresses(), computed if not given."""
+    if S is None:
+        S = equilibrium_stresses(graph, tol)[1]
+    support = np.linalg.norm(S, axis=1) > tol
+    return [tuple(e) for (e, s) in zip(graph[1], support) if s]
+
+def rigidity_analysis(graph, tol=1e-9):
+    """Analyse graph's framework in the plane, returning a dict with
+    the rigidity matrix's rank, the degrees of freedom beyond the trivial motions,
+    the stress basis, the redundant edges and the rank of a generic
+    (random) combination of the stresses' stress matrices.
+
+    By Connelly's criterion a generic framework is globally rigid if it is
+    rigid and has a stress matrix of rank |V|-3; "globally_rigid" records
+    whether that holds (it is only sufficient for non-generic frameworks,
+    such as most unit-distance graphs here)."""
+    vertices, edges = graph
+    nv = len(vertices)
+    rank, S = equilibrium_stresses(graph, tol)
+    dof = max(2*nv - 3, 0) - rank
+    if S.shape[1]:
+        omega = S @ rng.standard_normal(S.shape[1])
+        eigs = np.linalg.eigvalsh(stress_matrix(graph, omega))
+        stress_rank = int((abs(eigs) > tol * abs(eigs).max()).sum())
+    else:
+        stress_rank = 0
+    return {"rank": rank, "dof": dof, "stresses": S,
+            "redundant_edges": redundant_edges(graph, S, tol),
+            "stress_rank": stress_rank,
+            "globally_rigid": dof == 0 and (nv <= 3 or stress_rank == nv - 3)}
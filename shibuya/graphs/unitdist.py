@@ -3,7 +3,7 @@ Other unit-distance graphs...
 """
 from mpmath import *
 from shibuya.generators import (cu, star_radius, ring_edges,
-        all_unit_distances, fixparams_unitdist, symmetrise)
+        all_unit_distances, fixparams_unitdist, symmetrise, unitroots, root)
 
 def franklin():
     """Return a unit-distance embedding of the Franklin graph."""
@@ -0,0 +1,123 @@
+"""
+Enumeration of the embeddings a parametrisation admits. Functions decorated with
+fixparams_unitdist() solve their constraints from one initial guess; enumerate_embeddings()
+instead solves them from many quasi-random starts around it, in floating point (through
+backend.float_backend()) in a pool of processes, then polishes the distinct solutions at
+the working precision and ranks them by how degenerate they are.
+"""
+import math
+import os
+from inspect import unwrap
+from mpmath import *
+import numpy as np
+from shibuya.backend import float_backend
+from shibuya.generators import pool_map, refine_root
+
+def halton(n, dim, skip=0):
+    """Return the points skip+1 to skip+n of the dim-dimensional Halton sequence
+    as an n × dim array of numbers in [0, 1)."""
+    primes = []
+    k = 2
+    while len(primes) < dim:
+        if all(k % p for p in primes):
+            primes.append(k)
+        k += 1
+    res = np.zeros((n, dim))
+    for (j, p) in enumerate(primes):
+        i = np.arange(skip+1, skip+n+1)
+        f = 1.0
+        while i.any():
+            f /= p
+            res[:,j] += f * (i % p)
+            i //= p
+    return res
+
+def _float_solves(graphfunc, starts):
+    """Solve graphfunc's constraints in floating point from each start, returning
+    (solution, vertices as a complex array) for those that converge."""
+    f = unwrap(graphfunc)
+    res = []
+    with float_backend():
+        for x in starts:
+            try:
+                x = findroot(lambda *x: f(*x)[1], tuple(x))
+                x = tuple(float(t) for t in (x if isinstance(x, matrix) else [x]))
+                res.append((x, np.array([complex(v) for v in f(*x)[0]])))
+            except (ValueError, ZeroDivisionError, OverflowError):
+                pass
+    return res
+
+def _polish(graphfunc, x, prec):
+    """Refine a floating-point solution at the given precision, returning
+    (solution, vertices) or None if it does not converge."""
+    f = unwrap(graphfunc)
+    with workprec(prec):
+        try:
+            x = refine_root(lambda *x: f(*x)[1], x)[0]
+            return (x, f(*x)[0])
+        except (ValueError, ZeroDivisionError):
+            return None
+
+def _dedup(sols, tol):
+    """Merge the tuples (x, vertices as a complex array, hits, ...) whose vertices
+    all agree to within tol, keeping the first and adding up their hits."""
+    reps = []
+    for sol in sols:
+        for (i, rep) in enumerate(reps):
+            if np.abs(sol[1] - rep[1]).max() <= tol:
+                reps[i] = rep[:2] + (rep[2] + sol[2],) + rep[3:]
+                break
+        else:
+            reps.append(sol)
+    return reps
+
+def _degeneracy(V, tol, mindist):
+    """Return (coincident vertex pairs, unit-distance pairs) of the complex array V."""
+    D = np.abs(V[:,None] - V[None,:])[np.triu_indices(len(V), 1)]
+    return (int((D < mindist).sum()), int((abs(D - 1) <= tol).sum()))
+
+def enumerate_embeddings(graphfunc, starts=1000, box=None, processes=None, seed=0,
+                         tol=1e-9, mindist=1e-6):
+    """Find the distinct solutions of the constraints of graphfunc, a function
+    decorated with fixparams_unitdist() (possibly under other decorators), by
+    solving them in floating point from starts quasi-random (Halton) points in
+    box and polishing the solutions at the working precision with refine_root().
+    box is a list of (low, high) for each parameter; by default each initial
+    approximation x in graphfunc.x0 gives (x - 1 - |x|, x + 1 + |x|), with dictionaries
+    of approximations covering all their values. seed skips that many points of the
+    sequence, so different seeds give different starts. The float solves are
+    spread over a pool of processes; graphfunc must be defined at module level.
+
+    Solutions whose vertices all agree to within sqrt(tol) are the same.
+    Return a list of (x, vertices, hits, coincident, extra) sorted best first:
+    hits is how many starts led to the solution, coincident the number of
+    vertex pairs closer than mindist, and extra the number of unit distances
+    (to within tol) beyond the fewest among the embeddings with no coincident
+    vertices. Non-degenerate embeddings thus have coincident = extra = 0."""
+    if box is None:
+        x0 = graphfunc.x0
+        approx = list(x0.values()) if isinstance(x0, dict) else [x0]
+        approx = np.array([a if isinstance(a, (list, tuple)) else [a] for a in approx], dtype=float)
+        w = 1 + abs(approx).max(axis=0)
+        box = list(zip(approx.min(axis=0) - w, approx.max(axis=0) + w))
+    lo, hi = np.array(box, dtype=float).T
+    X = lo + (hi - lo) * halton(starts, len(box), seed)
+    n = 4 * (processes or os.cpu_count() or 1)
+    chunks = [X[i*starts//n:(i+1)*starts//n] for i in range(n)]
+    found = [(x, V, 1) for part in pool_map(_float_solves, [(graphfunc, c) for c in chunks], processes)
+             for (x, V) in part]
+    found = _dedup(found, math.sqrt(tol))
+    polished = pool_map(_polish, [(graphfunc, x, mp.prec) for (x, _, _) in found], processes)
+    sols = []
+    for (p, (_, _, hits)) in zip(polished, found):
+        if p is not None:
+            x, V = p
+            sols.append((x, np.array([complex(v) for v in V]), hits, V))
+    rows = []
+    for (x, Vc, hits, V) in _dedup(sols, math.sqrt(tol)):
+        rows.append([x, V, hits, *_degeneracy(Vc, tol, mindist)])
+    base = min((r[4] for r in rows if not r[3]), default=min((r[4] for r in rows), default=0))
+    for r in rows:
+        r[4] -= base
+    rows.sort(key=lambda r: (r[3], r[4], -r[2]))
+    return [tuple(r) for r in rows]
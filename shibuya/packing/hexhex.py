@@ -4,7 +4,8 @@ Cf. https://erich-friedman.github.io/packing/hexinhex
 and https://arxiv.org/abs/2511.02864 for the 12-hexagon packing.
 """
 from mpmath import *
-from shibuya.draw import drawing
+from shibuya.draw import drawing, on_side
+from shibuya.generators import unitroots, root
 
 def p12():
     w = unitroots(6) # rotations by multples of 60 degrees
@@ -34,7 +35,7 @@ def hexpath(v1, v2):
 def draw_packing(data, outfn, scale=400):
     s, hexsides = data
     res = drawing(scale, (2*s, sqrt(3)*s), (-s, -sqrt(3)/2*s))
-    for side in hexsides:
-        res.add_path(hexpath(*side), {"fill": "#6dc6fb", "stroke": "#1c92cd", "stroke-width": 0.01})
+    res.add_shapes("hexagon", None, [on_side("hexagon", *side) for side in hexsides],
+                   {"fill": "#6dc6fb", "stroke": "#1c92cd", "stroke-width": 0.01})
     res.add_path(hexpath(s, s*root(1,6,1)), {"fill": "none", "stroke": "#000", "stroke-width": 0.01})
     res.write(outfn)
@@ -7,7 +7,7 @@ and http://hydra.nat.uni-magdeburg.de/packing/cci/cci.html
 """
 from mpmath import *
 from shibuya.draw import drawing
-from shibuya.generators import cu
+from shibuya.generators import cu, unitroots
 
 def thas(t):
     """Given t = tan(x/2), return the point on the unit circle
@@ -152,9 +152,8 @@ def draw_packing(data, outfn, scale=400):
     d, points = data
     res = drawing(scale, (2+d, 2+d), (-(1+d/2), -(1+d/2)))
     res.add_circle(0, 0, 1, {"fill": "none", "stroke": "#000", "stroke-width": 0.005*d})
-    for p in points:
-        res.add_circle(p.real, p.imag, d/2, {"fill": "#6dc6fb", "fill-opacity": "0.8",
-                                             "stroke": "#1c92cd", "stroke-width": 0.005*d})
-        res.add_circle(p.real, p.imag, 0.02*d)
+    res.add_shapes("disc", d, points, {"fill": "#6dc6fb", "fill-opacity": "0.8",
+                                       "stroke": "#1c92cd", "stroke-width": 0.005*d})
+    res.add_shapes("disc", 0.04*d, points)
     res.add_circle(0, 0, 1+d/2, {"fill": "none", "stroke": "#000", "stroke-width": 0.005*d})
     res.write(outfn)
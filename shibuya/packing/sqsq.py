@@ -3,7 +3,7 @@ Packings of unit squares into the smallest possible unit square.
 Cf. https://erich-friedman.github.io/packing/squinsqu
 """
 from mpmath import *
-from shibuya.draw import drawing
+from shibuya.draw import drawing, on_side
 
 def ptriv(n):
     """Return the trivial packing of n unit squares in a square."""
@@ -68,10 +68,7 @@ def pn(n):
 def draw_packing(data, outfn, scale=400):
     s, sqsides = data
     res = drawing(scale, (s, s))
-    for (v1, v2) in sqsides:
-        v3 = v2 + 1j*(v2-v1)
-        v4 = v1 + v3 - v2
-        cmds = [["M", v1.real, v1.imag, v2.real, v2.imag, v3.real, v3.imag, v4.real, v4.imag], ["Z"]]
-        res.add_path(cmds, {"fill": "#6dc6fb", "stroke": "#1c92cd", "stroke-width": 0.01})
+    res.add_shapes("square", None, [on_side("square", *side) for side in sqsides],
+                   {"fill": "#6dc6fb", "stroke": "#1c92cd", "stroke-width": 0.01})
     res.add_rect(0, 0, s, s, {"fill": "none", "stroke": "#000", "stroke-width": 0.01})
     res.write(outfn)
@@ -0,0 +1,104 @@
+"""
+Per-thread working precision. mpmath keeps the precision of its global context mp
+in a single list shared by every thread, so a constructor raising it with extradps()
+or workprec() in one thread silently changes the results of constructors running in
+the others. thread_local_precision() makes mp's precision and rounding mode a
+per-thread setting; build_catalogue() uses it to construct graphs in a thread pool.
+Run as python -m shibuya.precision to check that a threaded build is bit-identical
+to a serial one.
+"""
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from mpmath import mp
+from shibuya.backend import construct
+from shibuya.catalogue import module_names, constructors
+
+class _local_prec_rounding:
+    """Stand-in for mp._prec_rounding (a [precision, rounding] list) holding a
+    separate list, and decimal precision, for each thread."""
+    def __init__(self, prec, rounding, dps):
+        self.default = (prec, rounding, dps)
+        self.local = threading.local()
+
+    def _data(self):
+        try:
+            return self.local.data
+        except AttributeError:
+            prec, rounding, dps = self.default
+            self.local.data = ([prec, rounding], [dps])
+            return self.local.data
+
+    def __iter__(self): return iter(self._data()[0])
+    def __getitem__(self, i): return self._data()[0][i]
+    def __setitem__(self, i, v): self._data()[0][i] = v
+    def __len__(self): return 2
+    def __repr__(self): return repr(self._data()[0])
+
+def _set_dps(ctx, n):
+    ctx._prec_rounding._data()[1][0] = n
+
+_local_context = type("local_context", (type(mp),), {
+    # _prec is always assigned together with _prec_rounding[0]
+    "_prec": property(lambda ctx: ctx._prec_rounding[0], lambda ctx, n: None),
+    "_dps": property(lambda ctx: ctx._prec_rounding._data()[1][0], _set_dps)})
+
+def thread_local_precision():
+    """Make the precision of mpmath's mp context (mp.prec, mp.dps, workprec() and
+    the like) local to each thread. New threads start at the precision mp had when
+    this was first called. This cannot be undone and costs a little speed in all
+    mpmath arithmetic; calling it again does nothing."""
+    if isinstance(mp._prec_rounding, _local_prec_rounding):
+        return
+    prec, rounding = mp._prec_rounding
+    local = _local_prec_rounding(prec, rounding, mp.dps)
+    for cls in (mp.mpf, mp.mpc, mp.constant):
+        cls._ctxdata[2] = local
+    mp._prec_rounding = local
+    vars(mp).pop("_prec", None)
+    vars(mp).pop("_dps", None)
+    mp.__class__ = _local_context
+
+def _build(modname, name, f, prec):
+    try:
+        return ((modname, name), construct(f, prec=prec))
+    except Exception as e:
+        return ((modname, name), f"{type(e).__name__}: {e}")
+
+def build_catalogue(modules=None, threads=None, prec=53):
+    """Construct every catalogue graph (modules as for gallery.build_gallery(), by
+    default all graph modules) at the given precision in bits, in a pool of threads
+    (threads=1 builds serially in this thread). Return a dictionary mapping
+    (module, name) to the graph, or to an error message if construction failed.
+    Anything the constructors print is suppressed."""
+    thread_local_precision()
+    if modules is None:
+        modules = [m for m in module_names() if m.startswith("shibuya.graphs.")]
+    jobs = [(modname, name, f, prec) for modname in modules for (name, f) in constructors(modname)]
+    with redirect_stdout(io.StringIO()):
+        if threads == 1:
+            return dict(_build(*job) for job in jobs)
+        with ThreadPoolExecutor(threads) as pool:
+            return dict(pool.map(lambda job: _build(*job), jobs))
+
+def _exact(x):
+    """A key identifying a number, or the numbers in a list, bit for bit."""
+    if isinstance(x, (list, tuple)):
+        return tuple(map(_exact, x))
+    return getattr(x, "_mpf_", None) or getattr(x, "_mpc_", None) or x
+
+def compare_builds(modules=None, threads=4, prec=53):
+    """Build the catalogue serially and in a pool of threads and return the
+    list of (module, name) whose results differ in any bit."""
+    serial = build_catalogue(modules, 1, prec)
+    threaded = build_catalogue(modules, threads, prec)
+    return [key for key in serial if _exact(serial[key]) != _exact(threaded.get(key))]
+
+if __name__ == "__main__":
+    prec = int(sys.argv[1]) if len(sys.argv) > 1 else 53
+    diff = compare_builds(prec=prec)
+    for (modname, name) in diff:
+        print(f"{modname.rsplit('.', 1)[-1]}.{name} differs")
+    print(f"{len(diff)} differences at {prec} bits")
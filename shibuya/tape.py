@@ -0,0 +1,224 @@
+"""
+Construction tapes. The *_vertices() functions are straight-line programs of cu(),
+arithmetic, expj() and the like; record() runs one once on tracer values and keeps
+the operations as a tape, which can then be replayed at the current mpmath precision,
+on float64 NumPy arrays of many parameter vectors at once, or to get the constraints'
+Jacobian, without going through the Python function again. The tape also tells which
+vertices each vertex is constructed from. Run as python -m shibuya.tape to check
+replays against the recorded functions.
+"""
+import operator
+import sys
+from contextlib import contextmanager
+import mpmath
+from mpmath import *
+import numpy as np
+from shibuya import generators
+from shibuya.generators import cu, circumcentre, cu_array, circumcentre_array, constraint_list
+from shibuya.graphs.rigidity import jacobian
+
+def _np_root(x, n, k=0):
+    return np.power(np.asarray(x, dtype=complex), 1/n) * np.exp(2j*np.pi*k/n)
+
+# op name: (mpmath implementation, NumPy implementation)
+ops = {"add": (operator.add, operator.add), "sub": (operator.sub, operator.sub),
+       "mul": (operator.mul, operator.mul), "truediv": (operator.truediv, operator.truediv),
+       "pow": (operator.pow, operator.pow), "neg": (operator.neg, operator.neg),
+       "abs": (abs, np.abs), "re": (re, np.real), "im": (im, np.imag), "conj": (conj, np.conj),
+       "cu": (cu, lambda *a: cu_array(*a)[0]),
+       "circumcentre": (circumcentre, lambda *a: circumcentre_array(*a)[0]),
+       "expj": (expj, lambda t: np.exp(1j*t)), "rect": (rect, lambda r, t: r*np.exp(1j*t)),
+       "mpc": (mpc, lambda a, b=0: a + 1j*b), "exp": (exp, np.exp), "sqrt": (sqrt, np.emath.sqrt),
+       "cbrt": (cbrt, np.cbrt), "root": (root, _np_root), "cos": (cos, np.cos), "sin": (sin, np.sin),
+       "tan": (tan, np.tan), "sec": (sec, lambda x: 1/np.cos(x)), "acos": (acos, np.emath.arccos),
+       "asin": (asin, np.emath.arcsin), "atan": (atan, np.arctan), "atan2": (atan2, np.arctan2)}
+
+class node:
+    """A value computed from the parameters during record()."""
+    __slots__ = ("tape", "slot")
+    def __init__(self, tape, slot):
+        self.tape = tape
+        self.slot = slot
+    def __add__(self, o): return self.tape.record("add", (self, o))
+    def __radd__(self, o): return self.tape.record("add", (o, self))
+    def __sub__(self, o): return self.tape.record("sub", (self, o))
+    def __rsub__(self, o): return self.tape.record("sub", (o, self))
+    def __mul__(self, o): return self.tape.record("mul", (self, o))
+    def __rmul__(self, o): return self.tape.record("mul", (o, self))
+    def __truediv__(self, o): return self.tape.record("truediv", (self, o))
+    def __rtruediv__(self, o): return self.tape.record("truediv", (o, self))
+    def __pow__(self, o): return self.tape.record("pow", (self, o))
+    def __rpow__(self, o): return self.tape.record("pow", (o, self))
+    def __neg__(self): return self.tape.record("neg", (self,))
+    def __pos__(self): return self
+    def __abs__(self): return self.tape.record("abs", (self,))
+    def conjugate(self): return self.tape.record("conj", (self,))
+    @property
+    def real(self): return self.tape.record("re", (self,))
+    @property
+    def imag(self): return self.tape.record("im", (self,))
+    def __bool__(self):
+        raise TypeError("branching on a traced value; only straight-line code can be recorded")
+    __lt__ = __le__ = __gt__ = __ge__ = __bool__
+
+class tape:
+    def __init__(self, nparams):
+        self.nparams = nparams
+        self.ops = [] # (op name, argument refs); a ref >= 0 is a slot, < 0 the constant consts[~ref]
+        self.consts = []
+        self.vertices = []
+        self.constraints = []
+        self.nested = False # whether the constraints come as one tuple
+
+    def record(self, name, args):
+        refs = []
+        for a in args:
+            if isinstance(a, node):
+                refs.append(a.slot)
+            else:
+                refs.append(~len(self.consts))
+                self.consts.append(a)
+        self.ops.append((name, tuple(refs)))
+        return node(self, self.nparams + len(self.ops) - 1)
+
+    def _ref(self, v):
+        """Turn an output value into a ref, recording constants as such."""
+        if isinstance(v, node):
+            return v.slot
+        self.consts.append(v)
+        return ~(len(self.consts) - 1)
+
+    def _replay(self, x, impl, consts):
+        vals = list(x)
+        get = lambda r: vals[r] if r >= 0 else consts[~r]
+        for (name, refs) in self.ops:
+            vals.append(ops[name][impl](*map(get, refs)))
+        return ([get(r) for r in self.vertices], [get(r) for r in self.constraints])
+
+    def __call__(self, *x):
+        """Replay at the current mpmath precision, returning the same
+        (vertices, constraint, ...) as the recorded function."""
+        vertices, cons = self._replay(x, 0, self.consts)
+        return (vertices, tuple(cons)) if self.nested else (vertices, *cons)
+
+    def batch(self, X):
+        """Replay in float64 for all rows of X (an array of shape (m, nparams))
+        at once, returning arrays of the vertices (m × number of vertices) and
+        constraints (m × number of constraints). Unconstructible points are nan."""
+        X = np.asarray(X, dtype=float).reshape(-1, self.nparams)
+        consts = [complex(c) if isinstance(c, mpmath.mpc) else float(c) if isinstance(c, mpmath.mpf) else c
+                  for c in self.consts]
+        with np.errstate(all="ignore"):
+            vertices, cons = self._replay(X.T, 1, consts)
+        m = len(X)
+        return (np.stack([np.broadcast_to(v, m) for v in vertices], axis=1) if vertices else np.zeros((m, 0)),
+                np.stack([np.broadcast_to(c, m) for c in cons], axis=1) if cons else np.zeros((m, 0)))
+
+    def jacobian(self, x, h=1e-6):
+        """Return the Jacobian of the constraints at x in float64 by central
+        differences, computed by a single batch() replay."""
+        x = np.asarray([float(t) for t in x])
+        steps = h * np.eye(self.nparams)
+        cons = self.batch(np.concatenate([x + steps, x - steps]))[1]
+        return ((cons[:self.nparams] - cons[self.nparams:]) / (2*h)).T.real
+
+    def dependencies(self):
+        """Return (parents, params): for each vertex, the set of vertices whose
+        values are used to construct it (looking through intermediate values)
+        and the set of parameter indices it depends on."""
+        first = {}
+        for (i, r) in enumerate(self.vertices):
+            first.setdefault(r, i)
+        frontier = [set() for _ in range(self.nparams + len(self.ops))]
+        params = [{i} for i in range(self.nparams)] + [set() for _ in self.ops]
+        for (k, (_, refs)) in enumerate(self.ops):
+            s = self.nparams + k
+            for r in refs:
+                if r >= 0:
+                    frontier[s] |= {first[r]} if r in first else frontier[r]
+                    params[s] |= params[r]
+        get = lambda L, r: L[r] if r >= 0 else set()
+        return ([get(frontier, r) - {i} for (i, r) in enumerate(self.vertices)],
+                [get(params, r) for r in self.vertices])
+
+def _recording(name, impl):
+    def f(*args):
+        for a in args:
+            if isinstance(a, node):
+                return a.tape.record(name, args)
+        return impl(*args)
+    return f
+
+@contextmanager
+def tracing(g):
+    """Within this context the operations known to tapes, as bound in the module
+    defining g and in generators (for helpers like symmetrise(), directly or through
+    generators' caches), record themselves when given traced values."""
+    globs = [g.__globals__] + [vars(generators)] * (g.__globals__ is not vars(generators))
+    saved = [(glob, {name: glob[name] for (name, (impl, _)) in ops.items()
+                     if impl in (glob.get(name), getattr(glob.get(name), "__wrapped__", None))})
+             for glob in globs]
+    try:
+        for (glob, old) in saved:
+            glob.update({name: _recording(name, ops[name][0]) for name in old})
+        yield
+    finally:
+        for (glob, old) in saved:
+            glob.update(old)
+
+def record(g, nparams):
+    """Record g, a function of nparams parameters returning
+    (vertices, constraint, ...) or (vertices, (constraint, ...)), into a tape."""
+    T = tape(nparams)
+    with tracing(g):
+        res = g(*(node(T, i) for i in range(nparams)))
+    T.nested = len(res) == 2 and isinstance(res[1], (list, tuple))
+    T.vertices = [T._ref(v) for v in res[0]]
+    T.constraints = [T._ref(c) for c in constraint_list(res)]
+    return T
+
+def check_replay(g, x, tol=1e-9):
+    """Record g and compare, at x, its replay at the working precision (which must be
+    identical), in float64 and the float64 Jacobian with g itself, returning a list
+    of the discrepancies found (empty if there are none)."""
+    T = record(g, len(x))
+    x = [mpmathify(t) for t in x]
+    res, rep = g(*x), T(*x)
+    errors = []
+    if len(res) != len(rep) or list(res[0]) != rep[0] or constraint_list(res) != constraint_list(rep):
+        errors.append("replay differs")
+    V, C = T.batch([x])
+    if np.abs(V[0] - np.array([complex(v) for v in res[0]])).max(initial=0) > tol:
+        errors.append("float64 vertices differ")
+    cons = constraint_list(res)
+    if np.abs(C[0] - np.array([complex(c) for c in cons])).max(initial=0) > tol:
+        errors.append("float64 constraints differ")
+    J = np.array(jacobian(lambda *y: [re(c) for c in constraint_list(g(*y))], x).tolist(), dtype=float)
+    if np.abs(T.jacobian(x) - J).max(initial=0) > 1e-5 * max(1, np.abs(J).max(initial=0)):
+        errors.append("Jacobian differs")
+    return errors
+
+if __name__ == "__main__":
+    from inspect import unwrap
+    from shibuya.graphs import cubesym, cubesym2
+    cases = [("cubesym.f42a_vertices", cubesym.f42a_vertices, (0.27, 1.36, 0.52)),
+             ("cubesym.f62a_vertices", cubesym.f62a_vertices, (-1.017, -0.819, 2.96, -0.282, -1.091, -0.624, 0.354)),
+             ("cubesym.f74a_vertices", cubesym.f74a_vertices, (2.91, 4.74, 5.5, 4.88, 5, -0.05, 0.07)),
+             ("cubesym.f86a_vertices", cubesym.f86a_vertices,
+              (3.60383, 3.44007, 4.34048, 5.63174, 3.26345, 0.488743, 0.113378, 0.236693))]
+    for mod in (cubesym, cubesym2):
+        for (name, f) in vars(mod).items():
+            x0 = getattr(f, "x0", None)
+            if isinstance(x0, tuple) and x0 and f.__module__ == mod.__name__:
+                cases.append((f"{mod.__name__.rsplit('.', 1)[-1]}.{name}", unwrap(f), x0))
+    failed = 0
+    for (name, g, x) in cases:
+        try:
+            errors = check_replay(g, x)
+        except Exception as e:
+            errors = [f"{type(e).__name__}: {e}"]
+        failed += bool(errors)
+        print(f"{name}: " + ("; ".join(errors) if errors else "ok"))
+    print(f"{len(cases) - failed}/{len(cases)} replay correctly")
+    if failed:
+        sys.exit(1)
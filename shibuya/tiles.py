@@ -0,0 +1,129 @@
+"""
+Tiled, multi-level rendering of graphs too big for a single drawing,
+like circular.hamming(d, q) for larger d. The graph is cut into a pyramid
+of square tiles (outdir/z/i/j.png, z = 0 being the whole graph in one tile),
+each drawn by a worker process with only the edges and vertices that touch it;
+edges shorter than a pixel and vertices smaller than one are left out at
+each level. An index.html viewer with panning and zooming is written too.
+"""
+import json
+import math
+import os
+import numpy as np
+from shibuya.generators import pool_map
+from shibuya.raster import raster
+
+def _edge_tiles(P, E, x0, ytop, s, k, margin):
+    """Return (edge numbers, tile columns, tile rows) listing the tiles of side s
+    (k × k of them, starting from x0 and ytop) that the edges E between points P
+    come within margin of."""
+    a, b = P[E[:,0]], P[E[:,1]]
+    lo, hi = np.minimum(a, b) - margin, np.maximum(a, b) + margin
+    i0 = np.clip(np.floor((lo[:,0] - x0) / s), 0, k-1).astype(int)
+    i1 = np.clip(np.floor((hi[:,0] - x0) / s), 0, k-1).astype(int)
+    j0 = np.clip(np.floor((ytop - hi[:,1]) / s), 0, k-1).astype(int)
+    j1 = np.clip(np.floor((ytop - lo[:,1]) / s), 0, k-1).astype(int)
+    w, h = i1 - i0 + 1, j1 - j0 + 1
+    counts = w * h
+    e = np.repeat(np.arange(len(E)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    di, dj = np.divmod(local, h[e])
+    i, j = i0[e] + di, j0[e] + dj
+    # drop tiles in the bounding box that the segment itself misses
+    c = np.stack([x0 + (i + 0.5)*s, ytop - (j + 0.5)*s], axis=1)
+    d = b[e] - a[e]
+    L = np.maximum(np.hypot(d[:,0], d[:,1]), 1e-300)
+    across = abs(d[:,0]*(c[:,1] - a[e,1]) - d[:,1]*(c[:,0] - a[e,0])) / L
+    keep = across <= s/math.sqrt(2) + margin
+    return (e[keep], i[keep], j[keep])
+
+def _render_tile(surface, scale, s, offset, points, edges, dots, vertsize, edgewidth, outfn):
+    res = surface(scale, (s, s), offset)
+    if len(edges):
+        res.add_edges(points, edges, {"fill": "none", "stroke": "#000", "stroke-width": edgewidth,
+                                      "stroke-linejoin": "round"})
+    if len(dots):
+        res.add_dots(dots, vertsize)
+    res.write(outfn)
+
+def render_tiles(graph, outdir, levels=4, tile=256, pad=0.04, vertsize=0.02, edgewidth=0.005,
+                 minpx=1, surface=raster, processes=None):
+    """Render graph, specified as (vertices, edges), as a pyramid of tiles of
+    tile × tile pixels at zoom levels 0 to levels-1 into outdir, along with
+    index.html for viewing them. pad, vertsize and edgewidth are as for
+    draw_graph(). At each level edges shorter than minpx pixels and vertices
+    of diameter less than minpx pixels are culled. Empty tiles are not written.
+    Tiles are drawn on surface (raster for PNG, drawing for SVG) in a pool of
+    processes. Return the number of tiles written."""
+    vertices, edges = graph
+    P = np.array([(float(v.real), float(v.imag)) for v in vertices])
+    E = np.array(edges, dtype=int).reshape(-1, 2)
+    x0, y0 = P.min(axis=0) - pad
+    S = float((P.max(axis=0) + pad - (x0, y0)).max())
+    ytop = y0 + S
+    ext = ".png" if surface is raster else ".svg"
+    lengths = np.hypot(*(P[E[:,0]] - P[E[:,1]]).T)
+    jobs = []
+    for z in range(levels):
+        k = 1 << z
+        s = S / k
+        scale = tile / s
+        margin = max(vertsize, edgewidth)
+        live = np.flatnonzero(lengths*scale >= minpx)
+        e, i, j = _edge_tiles(P, E[live], x0, ytop, s, k, margin)
+        tiles = {}
+        for (en, key) in zip(live[e], zip(i.tolist(), j.tolist())):
+            tiles.setdefault(key, ([], []))[0].append(en)
+        if 2*vertsize*scale >= minpx:
+            vi = np.clip(np.floor((P[:,0] - x0) / s), 0, k-1).astype(int)
+            vj = np.clip(np.floor((ytop - P[:,1]) / s), 0, k-1).astype(int)
+            for (di, dj) in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+                ti, tj = vi + di, vj + dj
+                cx, cy = x0 + (ti + 0.5)*s, ytop - (tj + 0.5)*s
+                near = ((ti >= 0) & (ti < k) & (tj >= 0) & (tj < k) &
+                        (abs(P[:,0] - cx) <= s/2 + vertsize) & (abs(P[:,1] - cy) <= s/2 + vertsize))
+                for v in np.flatnonzero(near):
+                    tiles.setdefault((int(ti[v]), int(tj[v])), ([], []))[1].append(v)
+        for ((ti, tj), (es, vs)) in tiles.items():
+            used, inv = np.unique(E[es].ravel(), return_inverse=True)
+            os.makedirs(os.path.join(outdir, str(z), str(ti)), exist_ok=True)
+            jobs.append((surface, scale, s, (x0 + ti*s, ytop - (tj + 1)*s),
+                         [tuple(p) for p in P[used]], inv.reshape(-1, 2).tolist(),
+                         [tuple(p) for p in P[vs]], vertsize, edgewidth,
+                         os.path.join(outdir, str(z), str(ti), str(tj))))
+    pool_map(_render_tile, jobs, processes, chunksize=max(1, len(jobs) // 64))
+    write_viewer(outdir, levels, tile, ext)
+    return len(jobs)
+
+viewer = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>Shibuya tiles</title>
+<style>html,body{margin:0;height:100%;overflow:hidden}#map{position:absolute;inset:0;cursor:grab}
+#map img{position:absolute}</style></head><body><div id="map"></div><script>
+const cfg = CONFIG, map = document.getElementById("map");
+let zoom = 0, cx = cfg.tile/2, cy = cfg.tile/2; // view centre in level-0 pixels
+function draw() {
+  const z = Math.max(0, Math.min(cfg.levels-1, Math.round(zoom))), k = 1 << z;
+  const p = Math.pow(2, zoom), ts = cfg.tile*p/k;
+  const ox = map.clientWidth/2 - cx*p, oy = map.clientHeight/2 - cy*p;
+  map.innerHTML = "";
+  for (let i = Math.max(0, Math.floor(-ox/ts)); i < k && i*ts + ox < map.clientWidth; i++)
+    for (let j = Math.max(0, Math.floor(-oy/ts)); j < k && j*ts + oy < map.clientHeight; j++) {
+      const img = document.createElement("img");
+      img.src = `${z}/${i}/${j}${cfg.ext}`; img.onerror = () => img.remove();
+      img.style.cssText = `left:${i*ts+ox}px;top:${j*ts+oy}px;width:${ts}px;height:${ts}px`;
+      map.appendChild(img);
+    }
+}
+map.onwheel = e => { e.preventDefault(); zoom = Math.max(0, Math.min(cfg.levels + 2, zoom - e.deltaY/500)); draw(); };
+map.onmousedown = e => {
+  const move = m => { const p = Math.pow(2, zoom); cx -= m.movementX/p; cy -= m.movementY/p; draw(); };
+  window.addEventListener("mousemove", move);
+  window.addEventListener("mouseup", () => window.removeEventListener("mousemove", move), {once: true});
+};
+window.onresize = draw; draw();
+</script></body></html>
+"""
+
+def write_viewer(outdir, levels, tile, ext=".png"):
+    """Write index.html in outdir, a viewer for the tile pyramid there."""
+    with open(os.path.join(outdir, "index.html"), "w") as f:
+        f.write(viewer.replace("CONFIG", json.dumps({"levels": levels, "tile": tile, "ext": ext})))